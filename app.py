@@ -1,17 +1,31 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, Response
+from flask import Flask, Blueprint, render_template, redirect, url_for, request, flash, Response, stream_with_context, send_file, abort, make_response, current_app
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-from sqlalchemy import func, text
+from datetime import datetime, date, timedelta
+from sqlalchemy import or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 import json
+import click
 import os
-import csv
-import io
-import xlsxwriter
-from dateutil.relativedelta import relativedelta  # pro posun v datech
+import tempfile
 
 # Import modelů – předpokládáme, že models.py obsahuje třídy User, Project, LogEntry
-from models import db, User, Project, LogEntry
+from models import (db, User, Project, LogEntry, DailyRollup, ActiveTimer, Job, Team, TeamMembership,
+                    pauses_error)
+from rollup import rebuild_rollup
+import archive
+from archive import archive_entries
+from exports import iter_csv, write_excel, CSV_MIMETYPE, EXCEL_MIMETYPE
+from sql_funcs import PERIODS
+from teams import (accessible_projects, can_log_to, user_teams, get_membership, team_members,
+                   team_report, MANAGER, MEMBER, ROLES)
+import report_cache
+import user_cache
+import instrumentation
+import jobs
+from bulk_import import import_rows, read_upload
+from revisions import get_revision, make_etag, not_modified, add_validators
 
 # Import kalendářového blueprintu
 from calendar_bp import bp as calendar_bp
@@ -26,50 +40,24 @@ def parse_local_time(value):
     return None
 
 
-ALL_COLUMNS = [
-    ("id", "ID"),
-    ("project", "Projekt"),
-    ("start_time", "Začátek"),
-    ("end_time", "Konec"),
-    ("pause_start", "Start pauzy"),
-    ("pause_end", "Konec pauzy"),
-    ("note", "Poznámka"),
-    ("hours", "Odpracované hodiny")
-]
-
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI','mysql+pymysql://dochazka_user:dochazka_pass@db:3306/dochazka')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'supertajnyklic'
-
-# Inicializace databáze a Flask-Login
-db.init_app(app)
-login_manager = LoginManager()
-login_manager.login_view = 'login'
-login_manager.init_app(app)
-
-# Import a registrace kalendářového Blueprintu
-from calendar_bp import bp as calendar_bp
-app.register_blueprint(calendar_bp)
+LOGS_PAGE_SIZE = 50
 
+bp = Blueprint('main', __name__, cli_group=None)
 
-# Inicializace Flask-Migrate
-from flask_migrate import Migrate
-migrate = Migrate(app, db)
-
-#Registrace kalendářového blueprintu
-#app.register_blueprint(calendar_bp)
+# Rozšíření se inicializují až v create_app()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
 
 # Načítání uživatele pro Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load_identity(db.session, int(user_id))
 
 # --------------------------------------------------
 #                  ROUTY A FUNKCE
 # --------------------------------------------------
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -77,12 +65,12 @@ def login():
         user = User.query.filter_by(username=username).first()
         if user and check_password_hash(user.password, password):
             login_user(user)
-            return redirect(url_for('projects'))
+            return redirect(url_for('main.projects'))
         else:
             flash('Neplatné uživatelské jméno nebo heslo')
     return render_template('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -94,52 +82,72 @@ def register():
             db.session.add(new_user)
             db.session.commit()
             flash('Uživatel vytvořen. Nyní se můžeš přihlásit.')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
     return render_template('register.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/projects')
+@bp.route('/projects')
 @login_required
 def projects():
-    projects = Project.query.filter_by(user_id=current_user.id).all()
+    # vlastní projekty i sdílené projekty týmů (název týmu do tabulky)
+    projects = accessible_projects(current_user.id).options(joinedload(Project.team)).all()
     return render_template('projects.html', projects=projects)
 
-@app.route('/projects/create', methods=['GET', 'POST'])
+@bp.route('/projects/create', methods=['GET', 'POST'])
 @login_required
 def create_project():
     if request.method == 'POST':
         name = request.form.get('name')
-        if name:
-            new_project = Project(name=name, user_id=current_user.id)
+        team_id = request.form.get('team_id', type=int)
+        if not name:
+            flash('Název projektu je povinný.')
+        elif team_id and getattr(get_membership(team_id, current_user.id), 'role', None) != MANAGER:
+            # sdílet projekt s týmem smí jen jeho manažer
+            flash('Projekt lze sdílet jen s týmem, který spravujete.')
+        else:
+            new_project = Project(name=name, user_id=current_user.id, team_id=team_id or None)
             db.session.add(new_project)
             db.session.commit()
-            return redirect(url_for('projects'))
-        else:
-            flash('Název projektu je povinný.')
-    return render_template('create_project.html')
+            return redirect(url_for('main.projects'))
+    teams = [team for team, role in user_teams(current_user.id) if role == MANAGER]
+    return render_template('create_project.html', teams=teams)
 
-@app.route('/projects/delete/<int:project_id>', methods=['POST'])
+@bp.route('/projects/delete/<int:project_id>', methods=['POST'])
 @login_required
 def delete_project(project_id):
     project = Project.query.get_or_404(project_id)
     if project.user_id != current_user.id:
         flash('Nemáte oprávnění smazat tento projekt.')
-        return redirect(url_for('projects'))
+        return redirect(url_for('main.projects'))
+    DailyRollup.query.filter_by(project_id=project.id).delete()
+    archive.delete_project_entries(project.id)
     db.session.delete(project)
     db.session.commit()
-    return redirect(url_for('projects'))
+    return redirect(url_for('main.projects'))
+
+def commit_pauses(log_entry):
+    """
+    Uloží pauzu nebo konec záznamu z /log. Ručně zadané časy mohou
+    dát pauzu mimo záznam nebo přes jinou – pak se změna zahodí a uživatel
+    dostane chybu.
+    """
+    error = log_entry.pauses_error()
+    if error:
+        db.session.rollback()
+        flash(error)
+    else:
+        db.session.commit()
 
-@app.route('/log', methods=['GET', 'POST'])
+@bp.route('/log', methods=['GET', 'POST'])
 @login_required
 def log_time():
-    projects = Project.query.filter_by(user_id=current_user.id).all()
     if request.method == 'POST':
-        project_id      = request.form.get('project_id')
+        project_id      = int(request.form.get('project_id'))
         action          = request.form.get('action')
         note            = request.form.get('note')
         parsed_start    = parse_local_time(request.form.get('start_time'))
@@ -148,16 +156,16 @@ def log_time():
         parsed_pause_e  = parse_local_time(request.form.get('pause_end_time'))
 
         if not parsed_start and action == 'start':
-            parsed_start = datetime.now(LOCAL_TZ).astimezone(UTC_TZ)
+            parsed_start = datetime.now()
 
-        current_log = LogEntry.query.filter_by(
-            user_id=current_user.id,
-            project_id=project_id,
-            end_time=None
-        ).first()
+        # Běžící činnost se hledá podle primárního klíče malé tabulky active_timer
+        timer = db.session.get(ActiveTimer, (current_user.id, project_id))
+        current_log = timer.log_entry if timer else None
 
         if action == 'start':
-            if not current_log:
+            if not can_log_to(current_user.id, project_id):
+                flash('Na tento projekt nemůžete vykazovat.')
+            elif not timer:
                 new_log = LogEntry(
                     project_id=project_id,
                     user_id=current_user.id,
@@ -166,94 +174,185 @@ def log_time():
                 )
                 if parsed_end:
                     new_log.end_time = parsed_end
+                else:
+                    new_log.active_timer = ActiveTimer(user_id=current_user.id, project_id=project_id)
                 db.session.add(new_log)
-                db.session.commit()
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # souběžný Start na stejném projektu už timer založil
+                    db.session.rollback()
+                    flash('Činnost již probíhá.')
             else:
                 flash('Činnost již probíhá.')
         elif action == 'end':
             if current_log:
                 current_log.end_time = parsed_end if parsed_end else datetime.now()
-                db.session.commit()
+                # práce skončila během pauzy – pauza končí s ní
+                if current_log.open_pause:
+                    current_log.end_pause(current_log.end_time)
+                db.session.delete(timer)
+                commit_pauses(current_log)
             else:
                 flash('Žádná aktivní činnost k ukončení.')
         elif action == 'pause_start':
-            if current_log and not current_log.pause_start:
-                current_log.pause_start = parsed_pause_s if parsed_pause_s else datetime.now()
-                db.session.commit()
+            # pauz může být víc, jen nesmí jedna zrovna probíhat
+            if current_log and not current_log.open_pause:
+                current_log.start_pause(parsed_pause_s if parsed_pause_s else datetime.now())
+                commit_pauses(current_log)
             else:
                 flash('Nelze spustit pauzu (možná již probíhá).')
         elif action == 'pause_end':
-            if current_log and current_log.pause_start and not current_log.pause_end:
-                current_log.pause_end = parsed_pause_e if parsed_pause_e else datetime.now()
-                db.session.commit()
+            if current_log and current_log.open_pause:
+                current_log.end_pause(parsed_pause_e if parsed_pause_e else datetime.now())
+                commit_pauses(current_log)
             else:
                 flash('Pauza nebyla spuštěna nebo již ukončena.')
         else:
             flash('Neznámá akce.')
-        return redirect(url_for('log_time'))
+        return redirect(url_for('main.log_time'))
 
+    projects = accessible_projects(current_user.id).all()
     return render_template('log_time.html', projects=projects)
 
-@app.route('/logs')
+def format_logs_cursor(row):
+    return '%s_%d' % (row.start_time.isoformat(), row.id)
+
+
+def parse_logs_cursor(value):
+    """
+    Kurzor stránkování ve tvaru "<start_time ISO>_<id>" -> (datetime, id).
+    """
+    if not value:
+        return None
+    try:
+        start, log_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(start), int(log_id)
+    except ValueError:
+        abort(400)
+
+
+@bp.route('/logs')
 @login_required
 def logs():
-    user_logs = LogEntry.query.filter_by(user_id=current_user.id).order_by(LogEntry.start_time.desc()).all()
-    logs_with_hours = []
-    for log in user_logs:
-        total_minutes = 0
-        if log.start_time and log.end_time:
-            total_minutes = (log.end_time - log.start_time).total_seconds() / 60.0
-        if log.pause_start and log.pause_end:
-            total_minutes -= (log.pause_end - log.pause_start).total_seconds() / 60.0
-        logs_with_hours.append({
-            "id": log.id,
-            "project_name": log.project.name if log.project else "",
-            "start_time": log.start_time,
-            "end_time": log.end_time,
-            "pause_start": log.pause_start,
-            "pause_end": log.pause_end,
-            "note": log.note,
-            "hours": total_minutes / 60.0
-        })
-    return render_template('logs.html', logs=logs_with_hours)
+    # Keyset stránkování podle (start_time, id) sestupně:
+    # ?before=<kurzor> = starší stránka, ?after=<kurzor> = novější stránka
+    before = parse_logs_cursor(request.args.get('before'))
+    after  = parse_logs_cursor(request.args.get('after'))
 
-@app.route('/logs/delete/<int:log_id>', methods=['POST'])
+    query = db.session.query(
+        LogEntry.id,
+        Project.name.label('project_name'),
+        LogEntry.start_time,
+        LogEntry.end_time,
+        (LogEntry.paused_minutes / 60.0).label('paused_hours'),
+        LogEntry.note,
+        (LogEntry.worked_minutes / 60.0).label('hours')
+    ).join(Project, Project.id == LogEntry.project_id) \
+     .filter(LogEntry.user_id == current_user.id)
+
+    if after:
+        # novější záznamy: čteme vzestupně od kurzoru a pak otočíme
+        query = query.filter(or_(LogEntry.start_time > after[0],
+                                 and_(LogEntry.start_time == after[0], LogEntry.id > after[1])))
+        rows = query.order_by(LogEntry.start_time.asc(), LogEntry.id.asc()) \
+                    .limit(LOGS_PAGE_SIZE + 1).all()
+        has_prev = len(rows) > LOGS_PAGE_SIZE
+        rows = rows[:LOGS_PAGE_SIZE][::-1]
+        has_next = True
+    else:
+        if before:
+            query = query.filter(or_(LogEntry.start_time < before[0],
+                                     and_(LogEntry.start_time == before[0], LogEntry.id < before[1])))
+        rows = query.order_by(LogEntry.start_time.desc(), LogEntry.id.desc()) \
+                    .limit(LOGS_PAGE_SIZE + 1).all()
+        has_next = len(rows) > LOGS_PAGE_SIZE
+        rows = rows[:LOGS_PAGE_SIZE]
+        has_prev = before is not None
+
+    prev_cursor = format_logs_cursor(rows[0]) if rows and has_prev else None
+    next_cursor = format_logs_cursor(rows[-1]) if rows and has_next else None
+    return render_template('logs.html', logs=rows,
+                           prev_cursor=prev_cursor, next_cursor=next_cursor)
+
+@bp.route('/logs/delete/<int:log_id>', methods=['POST'])
 @login_required
 def delete_log(log_id):
     log_entry = LogEntry.query.get_or_404(log_id)
     if log_entry.user_id != current_user.id:
         flash('Nemáte oprávnění smazat tento záznam.')
-        return redirect(url_for('logs'))
+        return redirect(url_for('main.logs'))
     db.session.delete(log_entry)
     db.session.commit()
     flash('Záznam byl úspěšně smazán.')
-    return redirect(url_for('logs'))
+    return redirect(url_for('main.logs'))
 
-@app.route('/logs/edit/<int:log_id>', methods=['GET', 'POST'])
+@bp.route('/logs/edit/<int:log_id>', methods=['GET', 'POST'])
 @login_required
 def edit_log(log_id):
     log_entry = LogEntry.query.get_or_404(log_id)
     if log_entry.user_id != current_user.id:
         flash('Nemáte oprávnění upravit tento záznam.')
-        return redirect(url_for('logs'))
+        return redirect(url_for('main.logs'))
     if request.method == 'POST':
-        log_entry.start_time  = parse_local_time(request.form.get('start_time')) or log_entry.start_time
-        log_entry.end_time    = parse_local_time(request.form.get('end_time'))
-        log_entry.pause_start = parse_local_time(request.form.get('pause_start_time'))
-        log_entry.pause_end   = parse_local_time(request.form.get('pause_end_time'))
+        # pauzy přicházejí jako souběžné seznamy začátků a konců; prázdné řádky vynecháme
+        pauses = [(parse_local_time(start), parse_local_time(end))
+                  for start, end in zip(request.form.getlist('pause_start_time'),
+                                        request.form.getlist('pause_end_time'))
+                  if start]
+        start_time = parse_local_time(request.form.get('start_time')) or log_entry.start_time
+        end_time   = parse_local_time(request.form.get('end_time'))
+        # pauzy mimo záznam nebo přes sebe by odečetly víc, než záznam trvá
+        error = pauses_error(start_time, end_time, pauses)
+        if error:
+            flash(error)
+            return redirect(url_for('main.edit_log', log_id=log_id))
+        log_entry.start_time  = start_time
+        log_entry.end_time    = end_time
         log_entry.note        = request.form.get('note')
-        db.session.commit()
+        log_entry.set_pauses(pauses)
+        # udržíme active_timer v souladu s tím, zda záznam běží
+        if log_entry.end_time and log_entry.active_timer:
+            log_entry.active_timer = None
+        elif not log_entry.end_time and not log_entry.active_timer:
+            log_entry.active_timer = ActiveTimer(user_id=log_entry.user_id,
+                                                 project_id=log_entry.project_id)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Na projektu už běží jiná činnost, záznam musí mít konec.')
+            return redirect(url_for('main.edit_log', log_id=log_id))
         flash('Záznam byl upraven.')
-        return redirect(url_for('logs'))
+        return redirect(url_for('main.logs'))
     return render_template('edit_log.html', log=log_entry)
 
-@app.route('/export', methods=['GET'])
+@bp.route('/export', methods=['GET'])
 @login_required
 def export():
-    projects = Project.query.filter_by(user_id=current_user.id).all()
+    projects = accessible_projects(current_user.id).all()
     return render_template('export.html', projects=projects)
 
-@app.route('/reports', methods=['GET'])
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_logs():
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Vyberte soubor k importu.')
+        else:
+            try:
+                rows = read_upload(upload)
+            except ValueError as exc:
+                flash(str(exc))
+            else:
+                result = import_rows(current_user.id, rows)
+                flash('Importováno záznamů: %d, chyb: %d' % (result['inserted'], len(result['errors'])))
+    return render_template('import.html', result=result)
+
+
+@bp.route('/reports', methods=['GET'])
 @login_required
 def reports_view():
     # 1) Read incoming filters
@@ -261,192 +360,363 @@ def reports_view():
     project_id = request.args.get('project_id', 'all')
     start_date = request.args.get('start_date')
     end_date   = request.args.get('end_date')
+    if period not in PERIODS:
+        period = 'monthly'
 
-    # 2) Load all user’s projects for the dropdown
-    projects = Project.query.filter_by(user_id=current_user.id).all()
-
-    # 3) Build base query
-    query = LogEntry.query.join(Project).filter(LogEntry.user_id == current_user.id)
-    if project_id != 'all':
-        query = query.filter(LogEntry.project_id == int(project_id))
-    if start_date:
-        query = query.filter(LogEntry.start_time >= datetime.fromisoformat(start_date))
-    if end_date:
-        # add one day so “Do” is inclusive
-        query = query.filter(LogEntry.start_time < datetime.fromisoformat(end_date) + relativedelta(days=1))
-
-    # 4) Fetch raw_data exactly as before, but using `query` instead of LogEntry.query.filter_by
-    if period == 'daily':
-        grouping = func.date(LogEntry.start_time)
-        label_fmt = lambda d: d.isoformat()
-    elif period == 'weekly':
-        grouping = func.yearweek(LogEntry.start_time)
-        label_fmt = str
-    else:  # monthly
-        grouping = func.date_format(LogEntry.start_time, '%Y-%m')
-        label_fmt = str
-
-    raw_data = (
-      db.session.query(
-        grouping.label('period'),
-        Project.name.label('project_name'),
-        (func.sum(
-            func.timestampdiff(text('MINUTE'), LogEntry.start_time, LogEntry.end_time)
-            - func.coalesce(func.timestampdiff(text('MINUTE'),
-                               LogEntry.pause_start, LogEntry.pause_end), 0)
-         ) / 60.0).label('total_hours')
-      )
-      .join(Project, Project.id == LogEntry.project_id)
-      .filter(LogEntry.user_id == current_user.id)
-      .group_by(grouping, Project.name)
-      .all()
-    )
+    # 2) Conditional GET – unchanged data means 304 without touching the rows
+    revision, updated_at = get_revision(current_user.id)
+    etag = make_etag(current_user.id, revision, 'reports', period, project_id, start_date, end_date)
+    cached = not_modified(etag, updated_at)
+    if cached is not None:
+        return cached
+
+    # 3) Load all user’s projects for the dropdown
+    projects = accessible_projects(current_user.id).all()
 
-    # 5) Pivot + build chart_data same as before
-    pivot = {}
-    proj_names = set()
-    for per, name, hrs in raw_data:
-        key = label_fmt(per)
-        pivot.setdefault(key, {})[name] = float(hrs or 0)
-        proj_names.add(name)
-    labels = sorted(pivot.keys())
-    datasets = []
-    colors = [ "rgba(54,162,235,0.5)", "rgba(255,99,132,0.5)", "rgba(255,206,86,0.5)" ]
-    for i, name in enumerate(sorted(proj_names)):
-        ds = {
-          "label": name,
-          "data": [ pivot[l].get(name, 0) for l in labels ],
-          "backgroundColor": colors[i % len(colors)],
-          "borderColor": colors[i % len(colors)].replace('0.5','1'),
-          "borderWidth": 1
-        }
-        datasets.append(ds)
-    chart_data = {"labels": labels, "datasets": datasets}
-
-    # 6) Pass everything into the template
-    return render_template(
+    # 4) Only the page shell – the aggregate data is fetched from /api/reports
+    return add_validators(make_response(render_template(
       'reports.html',
       period=period,
       projects=projects,
       project_id=project_id,
       start_date=start_date,
-      end_date=end_date,
-      chart_data=chart_data,
-      data_exists=bool(datasets)
-    )
+      end_date=end_date
+    )), etag, updated_at)
 
 
-@app.route('/export/csv')
+@bp.route('/export/csv')
 @login_required
 def export_csv():
-    # ... (původní export CSV) ...
+    chunks = iter_csv(current_user.id, request.args.get('project_id'),
+                      request.args.get('month'), request.args.getlist('columns'))
     return Response(
-        output,
-        mimetype="text/csv",
+        stream_with_context(chunks),
+        mimetype=CSV_MIMETYPE,
         headers={"Content-disposition": "attachment; filename=dochazka_export.csv"}
     )
 
-@app.route('/export/excel')
+@bp.route('/export/excel')
 @login_required
 def export_excel():
-    project_id = request.args.get('project_id')
-    month = request.args.get('month')
-    selected_columns = request.args.getlist('columns')
-    if not selected_columns:
-        selected_columns = [col[0] for col in ALL_COLUMNS]
-
-    query = LogEntry.query.filter_by(user_id=current_user.id)
-    if project_id and project_id.lower() != 'all':
-        query = query.filter(LogEntry.project_id == int(project_id))
-    if month:
-        start_date = datetime.strptime(month, '%Y-%m')
-        end_date = start_date + relativedelta(months=1)
-        query = query.filter(LogEntry.start_time >= start_date,
-                             LogEntry.start_time < end_date)
-
-    user_logs = query.order_by(LogEntry.start_time.desc()).all()
-
-    # Zde definujeme output, do kterého workbook zapisuje
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-    worksheet = workbook.add_worksheet("Dochazka")
-
-    header_format = workbook.add_format({'bold': True, 'bg_color': '#DCE6F1'})
-    # hlavičky
-    headers = [label for key, label in ALL_COLUMNS if key in selected_columns]
-    for col_idx, header in enumerate(headers):
-        worksheet.write(0, col_idx, header, header_format)
-
-    # IDENTIFIKUJEME index sloupce s "hours"
-    hours_col = selected_columns.index('hours')
-
-    total_hours_sum = 0.0
-    row_idx = 1
-    for log in user_logs:
-        # vypočítáme odpracované hodiny
-        minutes = 0
-        if log.start_time and log.end_time:
-            minutes = (log.end_time - log.start_time).total_seconds() / 60.0
-        if log.pause_start and log.pause_end:
-            minutes -= (log.pause_end - log.pause_start).total_seconds() / 60.0
-        hours = round(minutes / 60.0, 2)
-        total_hours_sum += hours
-
-        # data řádku
-        data = []
-        for key in selected_columns:
-            if key == 'id':
-                data.append(log.id)
-            elif key == 'project':
-                data.append(log.project.name if log.project else '')
-            elif key == 'start_time':
-                data.append(log.start_time)
-            elif key == 'end_time':
-                data.append(log.end_time)
-            elif key == 'pause_start':
-                data.append(log.pause_start)
-            elif key == 'pause_end':
-                data.append(log.pause_end)
-            elif key == 'note':
-                data.append(log.note or '')
-            elif key == 'hours':
-                data.append(hours)
-        # zapíšeme řádek
-        for col, val in enumerate(data):
-            worksheet.write(row_idx, col, str(val))
-        row_idx += 1
-
-    # Přidáme na konec řádek se součtem hodin
-    sum_format = workbook.add_format({'bold': True})
-    worksheet.write(row_idx, 0, "Celkem hodin", sum_format)
-    worksheet.write(row_idx, hours_col, total_hours_sum, sum_format)
-
-    workbook.close()
+    output = tempfile.TemporaryFile()
+    write_excel(current_user.id, request.args.get('project_id'),
+                request.args.get('month'), request.args.getlist('columns'), output)
     output.seek(0)
 
-    return Response(
-        output.read(),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-disposition": "attachment; filename=dochazka_export.xlsx"}
+    # send_file posílá přímo dočasný soubor a po odeslání ho zavře (a tím smaže)
+    return send_file(
+        output,
+        mimetype=EXCEL_MIMETYPE,
+        as_attachment=True,
+        download_name="dochazka_export.xlsx"
     )
 
 
+@bp.route('/export/jobs', methods=['POST'])
+@login_required
+def enqueue_export():
+    """
+    Zařadí export na pozadí. Formulář dostane přesměrování na seznam úloh,
+    JSON klient 202 s id úlohy.
+    """
+    export_format = request.args.get('format') or request.form.get('format')
+    if export_format not in ('csv', 'excel'):
+        abort(400)
+    params = {
+        'project_id': request.form.get('project_id'),
+        'month': request.form.get('month'),
+        'columns': request.form.getlist('columns'),
+    }
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    try:
+        job = jobs.enqueue(current_user.id, 'export_' + export_format, params)
+    except jobs.JobLimitExceeded:
+        if wants_json:
+            return {'error': 'Příliš mnoho rozpracovaných úloh.'}, 429
+        flash('Máte rozpracováno příliš mnoho úloh, počkejte na jejich dokončení.')
+        return redirect(url_for('main.jobs_view'))
+    if wants_json:
+        return {'id': job.id, 'status_url': url_for('calendar_api.get_job', job_id=job.id)}, 202
+    flash('Export byl zařazen, soubor si stáhnete níže.')
+    return redirect(url_for('main.jobs_view'))
+
+@bp.route('/jobs/rebuild-rollup', methods=['POST'])
+@login_required
+def enqueue_rebuild_rollup():
+    try:
+        jobs.enqueue(current_user.id, 'rebuild_rollup')
+        flash('Přepočet součtů byl zařazen.')
+    except jobs.JobLimitExceeded:
+        flash('Máte rozpracováno příliš mnoho úloh, počkejte na jejich dokončení.')
+    return redirect(url_for('main.jobs_view'))
+
+@bp.route('/jobs')
+@login_required
+def jobs_view():
+    user_jobs = Job.query.filter_by(user_id=current_user.id) \
+                         .order_by(Job.created_at.desc()).limit(20).all()
+    return render_template('jobs.html', jobs=user_jobs)
+
+@bp.route('/jobs/<job_id>/download')
+@login_required
+def download_job(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    if job.status != 'done' or not job.result_path or not os.path.exists(job.result_path):
+        abort(404)
+    mimetype = EXCEL_MIMETYPE if job.kind == 'export_excel' else CSV_MIMETYPE
+    return send_file(job.result_path, mimetype=mimetype, as_attachment=True,
+                     download_name=job.result_name)
+
+
+def get_team_membership(team_id, manager=False):
+    """
+    Členství přihlášeného uživatele v týmu; cizí tým je 404, správa
+    a týmový report bez role manažera 403.
+    """
+    membership = get_membership(team_id, current_user.id)
+    if membership is None:
+        abort(404)
+    if manager and membership.role != MANAGER:
+        abort(403)
+    return membership
+
+
+@bp.route('/teams')
+@login_required
+def teams_view():
+    return render_template('teams.html', teams=user_teams(current_user.id))
+
+
+@bp.route('/teams/create', methods=['POST'])
+@login_required
+def create_team():
+    name = (request.form.get('name') or '').strip()
+    if not name:
+        flash('Název týmu je povinný.')
+        return redirect(url_for('main.teams_view'))
+    # zakladatel je prvním manažerem týmu
+    team = Team(name=name)
+    team.memberships.append(TeamMembership(user_id=current_user.id, role=MANAGER))
+    db.session.add(team)
+    db.session.commit()
+    return redirect(url_for('main.team_detail', team_id=team.id))
+
+
+@bp.route('/teams/<int:team_id>')
+@login_required
+def team_detail(team_id):
+    membership = get_team_membership(team_id)
+    projects = Project.query.filter_by(team_id=team_id).order_by(Project.name).all()
+    return render_template('team_detail.html', team=membership.team, role=membership.role,
+                           members=team_members(team_id), projects=projects, roles=ROLES)
+
+
+@bp.route('/teams/<int:team_id>/members', methods=['POST'])
+@login_required
+def add_team_member(team_id):
+    get_team_membership(team_id, manager=True)
+    username = (request.form.get('username') or '').strip()
+    role = request.form.get('role') if request.form.get('role') in ROLES else MEMBER
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        flash('Uživatel "%s" neexistuje.' % username)
+    elif get_membership(team_id, user.id):
+        flash('Uživatel "%s" už je členem týmu.' % username)
+    else:
+        db.session.add(TeamMembership(team_id=team_id, user_id=user.id, role=role))
+        db.session.commit()
+        flash('Uživatel "%s" přidán do týmu.' % username)
+    return redirect(url_for('main.team_detail', team_id=team_id))
+
+
+@bp.route('/teams/<int:team_id>/members/<int:user_id>/delete', methods=['POST'])
+@login_required
+def remove_team_member(team_id, user_id):
+    get_team_membership(team_id, manager=True)
+    membership = get_membership(team_id, user_id)
+    if membership is None:
+        abort(404)
+    managers = TeamMembership.query.filter_by(team_id=team_id, role=MANAGER).count()
+    if membership.role == MANAGER and managers == 1:
+        flash('Tým musí mít alespoň jednoho manažera.')
+    else:
+        db.session.delete(membership)
+        db.session.commit()
+    return redirect(url_for('main.team_detail', team_id=team_id))
+
+
+@bp.route('/teams/<int:team_id>/report')
+@login_required
+def team_report_view(team_id):
+    membership = get_team_membership(team_id, manager=True)
+    period     = request.args.get('period', 'monthly')
+    start_date = request.args.get('start_date')
+    end_date   = request.args.get('end_date')
+    page       = max(1, request.args.get('page', 1, type=int))
+    if period not in PERIODS:
+        period = 'monthly'
+    if start_date is None and end_date is None:
+        # bez filtru jen aktuální rok – celá historie stovek lidí je zbytečně široká
+        start_date = date.today().replace(month=1, day=1).isoformat()
+    try:
+        for value in (start_date, end_date):
+            if value:
+                date.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+    report = team_report(team_id, period, start_date or None, end_date or None, page)
+    return render_template('team_report.html', team=membership.team, report=report,
+                           period=period, start_date=start_date, end_date=end_date)
+
+
 # --- Nová route pro kalendářové UI ---
-@app.route('/calendar')
+@bp.route('/calendar')
 @login_required
 def calendar_view():
-    return render_template('calendar.html')
+    projects = accessible_projects(current_user.id).all()
+    return render_template('calendar.html', projects=projects)
+
+# --------------------------------------------------
+#                CLI příkazy
+# --------------------------------------------------
+@bp.cli.command('rebuild-rollup')
+@click.option('--user-id', type=int, default=None, help='Přepočítat jen jednoho uživatele.')
+def rebuild_rollup_command(user_id):
+    """Přepočítá tabulku daily_rollup z log_entry."""
+    rows = rebuild_rollup(user_id)
+    click.echo('daily_rollup: %d řádků' % rows)
+
+
+@bp.cli.command('archive-logs')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archivovat uzavřené záznamy starší než N dní (výchozí ARCHIVE_HORIZON_DAYS).')
+@click.option('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE, help='Počet záznamů v jedné transakci.')
+def archive_logs_command(older_than_days, batch_size):
+    """Přesune staré uzavřené záznamy do ročních archivních tabulek."""
+    days = older_than_days or current_app.config['ARCHIVE_HORIZON_DAYS']
+    before = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    moved = archive_entries(before, batch_size)
+    click.echo('archivováno: %d záznamů (začátek před %s)' % (moved, before.date()))
+
+# --------------------------------------------------
+#                Aplikační factory
+# --------------------------------------------------
+def engine_options_from_env(database_uri):
+    """
+    Nastavení poolu spojení z proměnných prostředí. pool_pre_ping a
+    pool_recycle (kratší než wait_timeout MySQL) brání použití spojení,
+    které server mezitím zavřel.
+    """
+    options = {
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') != '0',
+    }
+    if not database_uri.startswith('sqlite'):
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        })
+    return options
+
+
+def create_app(config=None):
+    """
+    Vytvoří a nakonfiguruje instanci aplikace. `config` přepíše hodnoty
+    načtené z prostředí (testy, benchmarky).
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI','mysql+pymysql://dochazka_user:dochazka_pass@db:3306/dochazka')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'supertajnyklic')
+    # Cache reportů (v paměti, nebo sdílená přes REPORT_CACHE_URL)
+    app.config['REPORT_CACHE_URL'] = os.environ.get('REPORT_CACHE_URL')
+    app.config['REPORT_CACHE_SIZE'] = int(os.environ.get('REPORT_CACHE_SIZE', 512))
+    # Cache přihlášené identity a počítání SQL dotazů na požadavek
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    app.config['SQL_QUERY_COUNT_HEADER'] = os.environ.get('SQL_QUERY_COUNT_HEADER', '0') == '1'
+    # Metriky ve formátu Prometheus na /metrics (volitelně jen s tokenem)
+    # a log pomalých požadavků (0 = vypnuto)
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '0') == '1'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # Sdílený adresář, přes který /metrics sčítá čísla všech gunicorn workerů
+    app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+    app.config['METRICS_FLUSH_SECONDS'] = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+    app.config['SLOW_REQUEST_SECONDS'] = float(os.environ.get('SLOW_REQUEST_SECONDS', 0))
+    # Uzavřené záznamy starší než horizont přesouvá `flask archive-logs` do archivu
+    app.config['ARCHIVE_HORIZON_DAYS'] = int(os.environ.get('ARCHIVE_HORIZON_DAYS', 730))
+    # Úlohy na pozadí (jobs.py): vlákna na proces, limity na uživatele, úložiště výsledků
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+    app.config['JOB_USER_CONCURRENCY'] = int(os.environ.get('JOB_USER_CONCURRENCY', 1))
+    app.config['JOB_USER_QUEUE_LIMIT'] = int(os.environ.get('JOB_USER_QUEUE_LIMIT', 5))
+    app.config['JOB_RESULT_DIR'] = os.environ.get(
+        'JOB_RESULT_DIR', os.path.join(tempfile.gettempdir(), 'dochazka-jobs'))
+    app.config['JOB_RESULT_TTL'] = int(os.environ.get('JOB_RESULT_TTL', 24 * 3600))
+    app.config['JOB_TIMEOUT'] = int(os.environ.get('JOB_TIMEOUT', 3600))
+    # Příkazy `flask db ...` (Flask-Migrate/alembic); server je nepotřebuje
+    app.config['DB_MIGRATE_COMMANDS'] = os.environ.get('DB_MIGRATE_COMMANDS', '1') == '1'
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                          engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    # Inicializace databáze a Flask-Login
+    db.init_app(app)
+    login_manager.init_app(app)
+    if app.config['DB_MIGRATE_COMMANDS']:
+        init_migrate(app)
+    report_cache.init_app(app)
+    user_cache.init_app(app)
+    instrumentation.init_app(app)
+    jobs.init_app(app)
+
+    app.register_blueprint(bp)
+    app.register_blueprint(calendar_bp)
+    return app
+
+
+def init_migrate(app):
+    """
+    Zaregistruje Flask-Migrate (příkazy `flask db ...`). Import táhne celý
+    alembic, proto se volá jen tam, kde jsou příkazy potřeba – wsgi.py
+    ho vypíná.
+    """
+    from flask_migrate import Migrate
+    # roční archivní tabulky nejsou v modelech – autogenerate je nemá mazat
+    Migrate(app, db, include_object=archive.include_object)
+
+
+def init_db():
+    """
+    Založí výchozího uživatele admin. Schéma vytváří a aktualizuje
+    `flask db upgrade` (migrace), ne tato funkce.
+    """
+    if not User.query.filter_by(username='admin').first():
+        user = User(username='admin', password=generate_password_hash('admin'))
+        db.session.add(user)
+        db.session.commit()
+
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Založí výchozího uživatele admin (po `flask db upgrade`)."""
+    init_db()
+    click.echo('Výchozí uživatel připraven.')
 
 # --------------------------------------------------
-#                Spuštění aplikace
+#                Spuštění aplikace (vývoj)
 # --------------------------------------------------
 if __name__ == '__main__':
+    from flask_migrate import upgrade
+
+    app = create_app()
     with app.app_context():
-        db.create_all()
-        if not User.query.filter_by(username='admin').first():
-            user = User(username='admin', password=generate_password_hash('admin'))
-            db.session.add(user)
-            db.session.commit()
+        upgrade()
+        init_db()
 
     # --------------------------------------------------
     #   Vypišme všechny zaregistrované routy
@@ -457,4 +727,3 @@ if __name__ == '__main__':
     print("===============")
 
     app.run(host='0.0.0.0', debug=True)
-
@@ -0,0 +1,168 @@
+"""
+Archivace starých uzavřených záznamů do ročních tabulek.
+
+log_entry jen roste, přitom naprostá většina čtení míří do posledních
+měsíců. Příkaz `flask archive-logs` přesune uzavřené záznamy starší než
+zvolený horizont do tabulek log_entry_archive_<rok> (stejné sloupce
+a id). Seznam archivovaných roků drží malá tabulka archive_year.
+
+Čtecí cesty (kalendář, exporty, přepočet daily_rollup) používají
+entries_source(): dokud požadovaný rozsah nezasahuje do žádného
+archivovaného roku, čte se jen log_entry; jinak se přes UNION ALL přidají
+právě ty roční tabulky, které rozsah potřebuje. Reporty čtou daily_rollup,
+který archivace nemění.
+"""
+from sqlalchemy import (MetaData, Table, Column, Integer, Float, DateTime, Text, Index,
+                        select, union_all, or_, true, false)
+
+from models import db, LogEntry, Pause, ArchiveYear
+from revisions import mark_user_changed
+
+ARCHIVE_PREFIX = 'log_entry_archive_'
+DEFAULT_BATCH_SIZE = 5000
+
+# Roční tabulky nejsou součástí db.metadata – vznikají až při archivaci
+archive_metadata = MetaData()
+
+# sloupce společné pro log_entry i archivní tabulky, v tomto pořadí
+ENTRY_COLUMNS = ('id', 'project_id', 'user_id', 'start_time', 'end_time',
+                 'note', 'paused_minutes', 'worked_minutes')
+
+
+def archive_table(year):
+    """
+    Tabulka archivu pro daný rok (Table objekt; v databázi nemusí existovat).
+    """
+    name = '%s%d' % (ARCHIVE_PREFIX, year)
+    if name in archive_metadata.tables:
+        return archive_metadata.tables[name]
+    return Table(
+        name, archive_metadata,
+        Column('id', Integer, primary_key=True, autoincrement=False),
+        Column('project_id', Integer, nullable=False),
+        Column('user_id', Integer, nullable=False),
+        Column('start_time', DateTime),
+        Column('end_time', DateTime),
+        Column('note', Text),
+        # jednotlivé pauzy se nearchivují, stačí jejich součet
+        Column('paused_minutes', Float, nullable=False, server_default='0'),
+        Column('worked_minutes', Float, nullable=False, server_default='0'),
+        Index('ix_%s%d_user_start' % (ARCHIVE_PREFIX, year), 'user_id', 'start_time'),
+    )
+
+
+def is_archive_table(name):
+    return name.startswith(ARCHIVE_PREFIX)
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Filtr pro Alembic autogenerate: roční archivy nejsou v modelech,
+    takže je nesmí navrhovat ke smazání.
+    """
+    return not (type_ == 'table' and is_archive_table(name))
+
+
+def archived_years(range_start=None, range_end=None):
+    """
+    Archivované roky, které zasahují do rozsahu [range_start, range_end)
+    (None = bez omezení). Dotaz jde jen do malé tabulky archive_year.
+    """
+    query = db.session.query(ArchiveYear.year)
+    if range_start:
+        query = query.filter(ArchiveYear.year >= range_start.year)
+    if range_end:
+        query = query.filter(ArchiveYear.year <= range_end.year)
+    return [year for year, in query.order_by(ArchiveYear.year)]
+
+
+def entries_source(user_id, range_start=None, range_end=None, overlap=False):
+    """
+    Zdroj záznamů uživatele (None = všech) pro čtecí dotazy: buď přímo log_entry, nebo
+    UNION ALL s potřebnými ročními archivy. Výsledek má sloupce
+    ENTRY_COLUMNS + `archived` (bool). Filtr uživatele a rozsahu je
+    v každé větvi zvlášť, aby se použily indexy (user_id, start_time).
+
+    overlap=False: start_time v [range_start, range_end);
+    overlap=True:  záznam se s rozsahem překrývá (kalendář).
+    """
+    def branch(table, archived):
+        flag = true() if archived else false()
+        query = select(*[table.c[name] for name in ENTRY_COLUMNS], flag.label('archived'))
+        if user_id is not None:
+            query = query.where(table.c.user_id == user_id)
+        if range_end:
+            query = query.where(table.c.start_time < range_end)
+        if range_start:
+            if overlap:
+                query = query.where(or_(table.c.end_time.is_(None), table.c.end_time > range_start))
+            else:
+                query = query.where(table.c.start_time >= range_start)
+        return query
+
+    # archivují se jen uzavřené záznamy, takže podle začátku i překryvu stačí roky začátků
+    years = archived_years(range_start if not overlap else None, range_end)
+    if overlap and range_start:
+        # záznam z konce předchozího roku může přesahovat do okna
+        years = [year for year in years if year >= range_start.year - 1]
+    branches = [branch(LogEntry.__table__, False)]
+    branches += [branch(archive_table(year), True) for year in years]
+    if len(branches) == 1:
+        return branches[0].subquery('entries')
+    return union_all(*branches).subquery('entries')
+
+
+def archive_entries(before, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Přesune uzavřené záznamy začínající před `before` do ročních archivů.
+    Pracuje po dávkách (každá dávka = jedna transakce). Vrací počet
+    přesunutých záznamů.
+    """
+    entries = LogEntry.__table__
+    moved = 0
+    while True:
+        batch = db.session.execute(
+            select(entries.c.id, entries.c.user_id, entries.c.start_time)
+            .where(entries.c.start_time < before, entries.c.end_time.isnot(None))
+            .order_by(entries.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        by_year = {}
+        for entry_id, user_id, start_time in batch:
+            by_year.setdefault(start_time.year, []).append(entry_id)
+        # Tabulky vznikají na spojení session (jinak by na SQLite DDL čekalo na
+        # zámek, který drží INSERT předchozího roku) a dřív než první INSERT
+        # dávky – MySQL před DDL transakci potvrdí.
+        for year in by_year:
+            archive_table(year).create(db.session.connection(), checkfirst=True)
+        for year, year_ids in by_year.items():
+            table = archive_table(year)
+            if db.session.get(ArchiveYear, year) is None:
+                db.session.add(ArchiveYear(year=year))
+                db.session.flush()
+            db.session.execute(table.insert().from_select(
+                list(ENTRY_COLUMNS),
+                select(*[entries.c[name] for name in ENTRY_COLUMNS]).where(entries.c.id.in_(year_ids))
+            ))
+        ids = [row[0] for row in batch]
+        # pauzy mažeme výslovně – SQLite bez PRAGMA foreign_keys kaskádu neprovede
+        db.session.execute(Pause.__table__.delete().where(Pause.__table__.c.log_entry_id.in_(ids)))
+        db.session.execute(entries.delete().where(entries.c.id.in_(ids)))
+        # kalendář zobrazuje archivované záznamy jako needitovatelné – nová revize
+        for user_id in {row[1] for row in batch}:
+            mark_user_changed(db.session, user_id)
+        db.session.commit()
+        moved += len(batch)
+    return moved
+
+
+def delete_project_entries(project_id):
+    """
+    Smaže archivované záznamy projektu.
+    Bez commitu – volá se v rámci mazání projektu.
+    """
+    for year in archived_years():
+        table = archive_table(year)
+        db.session.execute(table.delete().where(table.c.project_id == project_id))
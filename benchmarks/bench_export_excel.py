@@ -0,0 +1,66 @@
+"""
+Benchmark exportu do Excelu nad syntetickými daty.
+
+Naplní dočasnou SQLite databázi zadaným počtem záznamů (výchozí 500 000),
+stáhne /export/excel přes Flask test client a vypíše čas a špičkovou RSS.
+
+ru_maxrss je špička za celý život procesu, takže by spotřebu exportu
+zakrylo plnění stovek tisíc řádků i hashování hesla při přihlášení. Data
+se proto plní v samostatném procesu a těsně před exportem se špička
+srovná na aktuální RSS (Linux) – přírůstek pak patří exportu.
+
+    python benchmarks/bench_export_excel.py --rows 500000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from common import use_temp_database, seed, login, peak_rss_mb, reset_peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000)
+    # interní: jen naplní databázi z SQLALCHEMY_DATABASE_URI a skončí
+    parser.add_argument('--seed-only', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed_only:
+        from app import create_app
+        with create_app().app_context():
+            seed(args.rows)
+        return
+
+    db_path = use_temp_database()
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--rows', str(args.rows),
+                    '--seed-only'], check=True)
+    print('seed: %d řádků za %.1f s' % (args.rows, time.perf_counter() - t0))
+
+    from app import create_app
+    app = create_app()
+    client = login(app)
+
+    if not reset_peak_rss():
+        print('varování: špičku RSS nelze vynulovat, obsahuje i start a přihlášení')
+    rss_before = peak_rss_mb()
+    t0 = time.perf_counter()
+    response = client.get('/export/excel', buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - t0
+
+    print('export: %.2f s, %.1f MiB souboru' % (elapsed, size / 1048576.0))
+    rss_after = peak_rss_mb()
+    print('peak RSS: %.1f MiB (před exportem %.1f MiB, export +%.1f MiB)' % (
+        rss_after, rss_before, rss_after - rss_before))
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
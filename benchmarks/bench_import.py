@@ -0,0 +1,62 @@
+"""
+Benchmark hromadného importu: řádků za sekundu přes POST /api/logs
+(jeden záznam = jeden požadavek a commit) a přes POST /api/logs/batch.
+
+    python benchmarks/bench_import.py --rows 5000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from common import use_temp_database, seed, login
+
+
+def make_rows(count, project_id):
+    start = datetime(2020, 1, 1, 8, 0)
+    rows = []
+    for i in range(count):
+        begin = start + timedelta(days=i // 3, hours=(i % 3) * 3)
+        rows.append({
+            'project_id': project_id,
+            'start': begin.isoformat(),
+            'end': (begin + timedelta(hours=2)).isoformat(),
+            'note': 'Import %d' % i,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from app import create_app
+    app = create_app()
+    from models import Project
+
+    with app.app_context():
+        seed(0, projects=1)
+        project_id = Project.query.first().id
+
+    client = login(app)
+    rows = make_rows(args.rows, project_id)
+
+    t0 = time.perf_counter()
+    for row in rows:
+        response = client.post('/api/logs', json=row)
+        assert response.status_code == 201, response.status_code
+    single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    response = client.post('/api/logs/batch', json=rows)
+    batch = time.perf_counter() - t0
+    assert response.json['inserted'] == args.rows, response.json['errors'][:5]
+
+    print('jednotlivě: %8.0f řádků/s (%.2f s)' % (args.rows / single, single))
+    print('dávkově:    %8.0f řádků/s (%.2f s)' % (args.rows / batch, batch))
+    print('zrychlení:  %8.1fx' % (single / batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark /api/reports: latence a počet SQL dotazů s filtry a bez nich.
+
+Ověřuje také, že filtrovaný report vrací jen období uvnitř zadaného okna
+a že agregační dotaz čte daily_rollup přes index (user_id, day).
+
+    python benchmarks/bench_reports.py --rows 100000
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from common import use_temp_database, seed, login
+
+
+def measure(client, url, engine, repeat):
+    from sqlalchemy import event
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', count)
+    timings = []
+    try:
+        for _ in range(repeat):
+            del statements[:]
+            t0 = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+            assert response.status_code == 200, response.status_code
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return response.get_json(), list(statements), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from app import create_app
+    # bez cache reportů – každé opakování měří agregační dotaz
+    app = create_app({'REPORT_CACHE_SIZE': 0})
+    from models import db
+
+    with app.app_context():
+        seed(args.rows)
+        engine = db.engine
+
+    client = login(app)
+    cases = [
+        ('bez filtru', '/api/reports?period=daily'),
+        ('1 měsíc', '/api/reports?period=daily&start_date=2016-03-01&end_date=2016-03-31'),
+        ('1 měsíc + projekt', '/api/reports?period=daily&start_date=2016-03-01&end_date=2016-03-31&project_id=1'),
+    ]
+    failed = False
+    for name, url in cases:
+        data, statements, timings = measure(client, url, engine, args.repeat)
+        labels = data['labels']
+        print('%-18s p50 %7.2f ms  max %7.2f ms  SQL %d  období %d' % (
+            name, statistics.median(timings), max(timings), len(statements), len(labels)))
+        if 'start_date' in url:
+            outside = [l for l in labels if not '2016-03-01' <= l <= '2016-03-31']
+            if outside or not labels:
+                print('  CHYBA: období mimo okno nebo prázdný výsledek: %s' % outside[:5])
+                failed = True
+            statement, parameters = [s for s in statements if 'daily_rollup' in s[0]][0]
+            with engine.connect() as conn:
+                plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            detail = ' | '.join(row[-1] for row in plan)
+            print('  plán: %s' % detail)
+            if 'daily_rollup USING INDEX' not in detail:
+                print('  CHYBA: agregace nečte daily_rollup přes index')
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
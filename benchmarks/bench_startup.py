@@ -0,0 +1,93 @@
+"""
+Doba startu aplikace: import wsgi (tj. import app + create_app) v čistém
+procesu, měřeno přes `python -X importtime`.
+
+Vypíše medián času do připravené aplikace, součet importů a nejdražší
+moduly. Skončí chybou, když medián překročí rozpočet (--budget-ms) nebo
+když se při startu serveru načte modul, který patří jen exportům či CLI
+(xlsxwriter, openpyxl, alembic, …) – takový import se má odkládat do
+funkce, která ho potřebuje.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --budget-ms 800
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from common import ROOT
+
+# moduly, které se při startu serveru načítat nemají
+FORBIDDEN = ('alembic', 'flask_migrate', 'xlsxwriter', 'openpyxl', 'dateutil', 'redis')
+
+PROBE = ('import time; t0 = time.perf_counter(); import %s; '
+         'print(time.perf_counter() - t0)')
+
+
+def run_once(target):
+    """
+    Jeden start v novém procesu: (sekundy do připravené aplikace,
+    [(modul, hloubka, kumulativní µs), ...]).
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE % target],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(cumulative)))
+    return float(result.stdout.strip().splitlines()[-1]), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', default='wsgi', help='modul, jehož import se měří')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('STARTUP_BUDGET_MS', 1500)))
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    walls, totals = [], []
+    for _ in range(args.runs):
+        wall, modules = run_once(args.target)
+        walls.append(wall * 1000.0)
+        # součet modulů nejvyšší úrovně = celý import včetně interpretu
+        totals.append(sum(us for _, depth, us in modules if depth == 0) / 1000.0)
+
+    wall_ms = statistics.median(walls)
+    print('import %s: medián %.1f ms (min %.1f, max %.1f), importy celkem %.1f ms' % (
+        args.target, wall_ms, min(walls), max(walls), statistics.median(totals)))
+
+    # nejdražší moduly z posledního běhu (bez samotného cíle a jeho obálek)
+    print('Nejdražší moduly (kumulativně):')
+    top = sorted((m for m in modules if m[0] not in (args.target, 'app')),
+                 key=lambda m: m[2], reverse=True)
+    seen = set()
+    for name, depth, us in top:
+        root = name.split('.')[0]
+        if root in seen:
+            continue
+        seen.add(root)
+        print('  %-40s %8.1f ms' % (name, us / 1000.0))
+        if len(seen) >= args.top:
+            break
+
+    failed = False
+    loaded = sorted({name for name, _, _ in modules if name.split('.')[0] in FORBIDDEN})
+    if loaded:
+        print('CHYBA: start načítá moduly, které patří jen exportům/CLI: %s' % ', '.join(loaded[:10]))
+        failed = True
+    if wall_ms > args.budget_ms:
+        print('CHYBA: start %.1f ms překračuje rozpočet %.0f ms' % (wall_ms, args.budget_ms))
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
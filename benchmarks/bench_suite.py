@@ -0,0 +1,239 @@
+"""
+Reprodukovatelná sada benchmarků hlavních stránek přes Flask test client.
+
+Naplní databázi (výchozí dočasná SQLite, případně prázdná databáze předaná
+přes --database) syntetickými daty se stejným seedem, projde /logs,
+/reports (kostra stránky) a /api/reports ve všech obdobích, /api/logs
+s okny kalendáře, exporty CSV/Excel a týmový report přes všechny
+uživatele a pro každý případ vypíše percentily latence, počet SQL dotazů,
+velikost odpovědi a špičku alokované paměti. Výsledek se uloží jako JSON
+(commit, parametry, prostředí), takže jde porovnat s během na jiném
+commitu:
+
+    python benchmarks/bench_suite.py --rows 20000 --output before.json
+    git checkout <jiný commit>
+    python benchmarks/bench_suite.py --rows 20000 --compare before.json
+
+Cache reportů je ve výchozím stavu vypnutá, aby se měřil výpočet a ne
+zásah do cache (--report-cache ji zapne).
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from common import ROOT, use_temp_database, seed_users, seed_team, login, peak_rss_mb
+
+PERIODS = ('daily', 'weekly', 'monthly')
+
+
+def percentile(values, pct):
+    # nejbližší pořadí – u malého počtu opakování bez interpolace
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_cases(first_day, last_day, team_id):
+    """
+    Případy (jméno, URL, těžký) odvozené z rozsahu dat, aby okna padla
+    doprostřed historie i na její konec.
+    """
+    middle = first_day + (last_day - first_day) / 2
+    month = middle.strftime('%Y-%m')
+    month_start = middle.replace(day=1)
+    week_start = last_day - timedelta(days=last_day.weekday())
+    # měsíční pohled kalendáře zabírá 6 týdnů od pondělí před 1. dnem měsíce
+    grid_start = month_start - timedelta(days=month_start.weekday())
+    window_end = (month_start + timedelta(days=32)).replace(day=1)
+
+    cases = [
+        ('logs', '/logs', False),
+        ('logs-hluboko', '/logs?before=%s_%d' % (middle.isoformat(), 2 ** 31), False),
+    ]
+    cases.append(('reports', '/reports', False))
+    for period in PERIODS:
+        cases.append(('api-reports-%s' % period, '/api/reports?period=%s' % period, False))
+    cases.append(('api-reports-daily-mesic',
+                  '/api/reports?period=daily&start_date=%s&end_date=%s' % (
+                      month_start.date().isoformat(),
+                      (window_end - timedelta(days=1)).date().isoformat()), False))
+    cases += [
+        ('api-logs-tyden', '/api/logs?start=%s&end=%s' % (
+            week_start.date().isoformat() + 'T00:00:00',
+            (week_start + timedelta(days=7)).date().isoformat() + 'T00:00:00'), False),
+        ('api-logs-mesic', '/api/logs?start=%s&end=%s' % (
+            grid_start.date().isoformat() + 'T00:00:00',
+            (grid_start + timedelta(days=42)).date().isoformat() + 'T00:00:00'), False),
+        ('export-csv-mesic', '/export/csv?month=%s' % month, False),
+        ('export-excel-mesic', '/export/excel?month=%s' % month, False),
+        ('export-csv', '/export/csv', True),
+        ('export-excel', '/export/excel', True),
+        # všichni uživatelé jsou v jednom týmu, měří první (manažer)
+        ('team-report', '/teams/%d/report?period=monthly&start_date=&end_date=' % team_id, False),
+        ('team-report-rok', '/teams/%d/report?period=weekly&start_date=%s&end_date=%s' % (
+            team_id, middle.replace(month=1, day=1).date().isoformat(),
+            middle.replace(month=12, day=31).date().isoformat()), False),
+    ]
+    return cases
+
+
+def run_case(clients, url, engine, repeat):
+    from sqlalchemy import event
+
+    queries = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        queries[0] += 1
+
+    def request(client):
+        response = client.get(url)
+        # streamované tělo (CSV) se generuje až při čtení
+        body = response.get_data()
+        response.close()
+        assert response.status_code == 200, (url, response.status_code)
+        return len(body)
+
+    # zahřátí: první požadavek platí kompilaci šablon a dotazů
+    for client in clients:
+        request(client)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    timings, counts = [], []
+    try:
+        for i in range(repeat):
+            client = clients[i % len(clients)]
+            queries[0] = 0
+            t0 = time.perf_counter()
+            size = request(client)
+            timings.append((time.perf_counter() - t0) * 1000.0)
+            counts.append(queries[0])
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    # špička alokací zvlášť – tracemalloc sám měření zpomaluje
+    tracemalloc.start()
+    request(clients[0])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'repeat': repeat,
+        'p50_ms': percentile(timings, 50),
+        'p90_ms': percentile(timings, 90),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': max(timings),
+        'mean_ms': sum(timings) / len(timings),
+        'queries': max(counts),
+        'response_bytes': size,
+        'peak_alloc_mb': peak / (1024.0 * 1024.0),
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print('\nPorovnání s %s (commit %s):' % (baseline_path, (baseline.get('commit') or '?')[:10]))
+    for name, case in results['cases'].items():
+        old = baseline.get('cases', {}).get(name)
+        if not old:
+            print('  %-20s (v základu chybí)' % name)
+            continue
+        delta = (case['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100.0 if old['p50_ms'] else 0.0
+        print('  %-20s p50 %8.2f -> %8.2f ms (%+6.1f %%)  SQL %d -> %d  paměť %.1f -> %.1f MB' % (
+            name, old['p50_ms'], case['p50_ms'], delta, old['queries'], case['queries'],
+            old['peak_alloc_mb'], case['peak_alloc_mb']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', help='URL prázdné databáze (výchozí dočasná SQLite)')
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--projects', type=int, default=8, help='projektů na uživatele')
+    parser.add_argument('--rows', type=int, default=20000, help='záznamů na uživatele')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--report-cache', action='store_true')
+    parser.add_argument('--only', action='append', help='jen případy začínající tímto jménem')
+    parser.add_argument('--output', help='kam uložit výsledky (JSON)')
+    parser.add_argument('--compare', help='JSON z předchozího běhu k porovnání')
+    args = parser.parse_args()
+
+    url = args.database
+    if not url:
+        use_temp_database()
+        url = os.environ['SQLALCHEMY_DATABASE_URI']
+    from app import create_app
+    from models import db, LogEntry
+
+    config = {'SQLALCHEMY_DATABASE_URI': url}
+    if not args.report_cache:
+        config['REPORT_CACHE_SIZE'] = 0
+    app = create_app(config)
+
+    t0 = time.perf_counter()
+    with app.app_context():
+        users = seed_users(args.users, args.projects, args.rows, seed=args.seed)
+        team_id = seed_team([user_id for _, user_id in users])
+        first_day, last_day = db.session.query(
+            db.func.min(LogEntry.start_time), db.func.max(LogEntry.start_time)
+        ).filter(LogEntry.user_id == users[0][1]).one()
+        engine = db.engine
+        dialect = engine.dialect.name
+    seed_seconds = time.perf_counter() - t0
+    print('Data: %d uživatelů × %d záznamů (%s až %s) za %.1f s' % (
+        args.users, args.rows, first_day.date(), last_day.date(), seed_seconds))
+
+    clients = [login(app, username) for username, _ in users]
+    results = {
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'params': {'users': args.users, 'projects': args.projects, 'rows': args.rows,
+                   'repeat': args.repeat, 'seed': args.seed,
+                   'report_cache': args.report_cache},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'database': dialect},
+        'seed_seconds': seed_seconds,
+        'cases': {},
+    }
+    for name, case_url, heavy in build_cases(first_day, last_day, team_id):
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        # celé exporty stačí změřit méněkrát
+        repeat = max(3, args.repeat // 5) if heavy else args.repeat
+        # týmový report smí jen manažer (první uživatel)
+        case_clients = clients[:1] if name.startswith('team-') else clients
+        case = run_case(case_clients, case_url, engine, repeat)
+        case['url'] = case_url
+        results['cases'][name] = case
+        print('%-20s p50 %8.2f  p95 %8.2f  p99 %8.2f ms  SQL %3d  %8.1f kB  alok. %6.1f MB' % (
+            name, case['p50_ms'], case['p95_ms'], case['p99_ms'], case['queries'],
+            case['response_bytes'] / 1024.0, case['peak_alloc_mb']))
+    results['peak_rss_mb'] = peak_rss_mb()
+    print('Špička RSS procesu: %.1f MB' % results['peak_rss_mb'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('Výsledky uloženy do %s' % args.output)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
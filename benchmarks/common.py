@@ -0,0 +1,223 @@
+"""
+Sdílené pomůcky benchmarků: dočasná SQLite databáze, syntetická data, přihlášení.
+"""
+import os
+import random
+import resource
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_USER = 'bench'
+
+
+def use_temp_database():
+    """
+    Nasměruje aplikaci na novou SQLite databázi; volat před importem app.
+    """
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    return db_path
+
+
+def peak_rss_mb():
+    # ru_maxrss je na Linuxu v KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def reset_peak_rss():
+    """
+    Srovná špičku RSS procesu na aktuální RSS (Linux, /proc/self/clear_refs),
+    aby peak_rss_mb() dál měřila jen to, co přijde potom. Vrací False, kde
+    to nejde.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def seed(rows, projects=10, chunk=10000, start=datetime(2015, 1, 1, 8, 0)):
+    """
+    Vytvoří uživatele 'bench' s projekty a `rows` záznamy (tři denně od `start`).
+    Volat uvnitř app contextu. Denní součty se přepočítají na konci.
+    """
+    from werkzeug.security import generate_password_hash
+    from sqlalchemy import func, text
+    from models import db, User, Project, LogEntry, Pause, worked_minutes
+    from rollup import rebuild_rollup
+
+    db.create_all()
+    user = User(username=BENCH_USER, password=generate_password_hash(BENCH_USER))
+    db.session.add(user)
+    db.session.commit()
+    project_ids = []
+    for i in range(projects):
+        project = Project(name='Projekt %d' % i, user_id=user.id)
+        db.session.add(project)
+        db.session.flush()
+        project_ids.append(project.id)
+    db.session.commit()
+
+    def flush_batch(entries, entry_pauses):
+        db.session.execute(LogEntry.__table__.insert(), entries)
+        if entry_pauses:
+            db.session.execute(Pause.__table__.insert(), entry_pauses)
+        db.session.commit()
+
+    rnd = random.Random(42)
+    day = start
+    # explicitní id, aby šly pauzy vložit hromadně hned za záznamy
+    next_id = (db.session.query(func.max(LogEntry.id)).scalar() or 0) + 1
+    batch = []
+    pauses = []
+    for i in range(rows):
+        begin = day + timedelta(minutes=rnd.randint(0, 120))
+        end = begin + timedelta(minutes=rnd.randint(60, 540))
+        paused = 0.0
+        if i % 3 == 0:
+            pauses.append({'log_entry_id': next_id + i,
+                           'start_time': begin + timedelta(minutes=30),
+                           'end_time': begin + timedelta(minutes=60)})
+            paused = 30.0
+        batch.append({
+            'id': next_id + i,
+            'user_id': user.id,
+            'project_id': rnd.choice(project_ids),
+            'start_time': begin,
+            'end_time': end,
+            'note': 'Poznámka %d' % i,
+            'paused_minutes': paused,
+            'worked_minutes': worked_minutes(begin, end, paused),
+        })
+        if i % 3 == 2:
+            day += timedelta(days=1)
+        if len(batch) >= chunk:
+            flush_batch(batch, pauses)
+            batch, pauses = [], []
+    if batch:
+        flush_batch(batch, pauses)
+    if db.engine.dialect.name == 'postgresql':
+        # sekvence o explicitních id neví
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('log_entry', 'id'), "
+                                "(SELECT MAX(id) FROM log_entry))"))
+        db.session.commit()
+    rebuild_rollup(user.id)
+    return user.id
+
+
+def seed_users(users, projects, rows, chunk=10000, start=datetime(2015, 1, 1), seed=42):
+    """
+    Vytvoří `users` uživatelů bench1, bench2, … (heslo = jméno), každému
+    `projects` projektů a `rows` záznamů s realistickým rozložením:
+    pracovní dny (víkend jen výjimečně), 1–4 záznamy denně, začátek kolem
+    osmé, délky log-normálně, oběd u dlouhých bloků, několik oblíbených
+    projektů (Zipf) a poznámky různé délky. Stejné `seed` = stejná data.
+    Volat uvnitř app contextu; vrací seznam (jméno, id).
+    """
+    from werkzeug.security import generate_password_hash
+    from sqlalchemy import func, text
+    from models import db, User, Project, LogEntry, Pause, worked_minutes
+    from rollup import rebuild_rollup
+
+    db.create_all()
+    rnd = random.Random(seed)
+    words = ('analýza', 'schůzka', 'oprava', 'revize', 'nasazení', 'dokumentace',
+             'testy', 'podpora', 'návrh', 'konzultace', 'migrace', 'report')
+    created = []
+    next_id = (db.session.query(func.max(LogEntry.id)).scalar() or 0) + 1
+    for u in range(1, users + 1):
+        username = '%s%d' % (BENCH_USER, u)
+        user = User(username=username, password=generate_password_hash(username))
+        db.session.add(user)
+        db.session.flush()
+        project_ids = []
+        for i in range(projects):
+            project = Project(name='Projekt %d-%d' % (u, i), user_id=user.id)
+            db.session.add(project)
+            db.session.flush()
+            project_ids.append(project.id)
+        db.session.commit()
+        weights = [1.0 / (rank + 1) for rank in range(len(project_ids))]
+
+        batch, pauses = [], []
+        day = start
+        made = 0
+        while made < rows:
+            if day.weekday() >= 5 and rnd.random() > 0.05:
+                day += timedelta(days=1)
+                continue
+            begin = day + timedelta(hours=8, minutes=int(rnd.gauss(0, 45)))
+            for _ in range(min(rnd.choice((1, 1, 2, 2, 2, 3, 4)), rows - made)):
+                minutes = max(15, min(600, int(rnd.lognormvariate(5.0, 0.6))))
+                end = begin + timedelta(minutes=minutes)
+                paused = 0.0
+                if minutes > 300:
+                    lunch = begin + timedelta(minutes=rnd.randint(180, minutes - 60))
+                    paused = float(rnd.randint(20, 45))
+                    pauses.append({'log_entry_id': next_id, 'start_time': lunch,
+                                   'end_time': lunch + timedelta(minutes=paused)})
+                batch.append({
+                    'id': next_id,
+                    'user_id': user.id,
+                    'project_id': rnd.choices(project_ids, weights)[0],
+                    'start_time': begin,
+                    'end_time': end,
+                    'note': ' '.join(rnd.choice(words) for _ in range(rnd.randint(0, 12))) or None,
+                    'paused_minutes': paused,
+                    'worked_minutes': worked_minutes(begin, end, paused),
+                })
+                next_id += 1
+                made += 1
+                begin = end + timedelta(minutes=rnd.randint(0, 30))
+            if len(batch) >= chunk:
+                db.session.execute(LogEntry.__table__.insert(), batch)
+                if pauses:
+                    db.session.execute(Pause.__table__.insert(), pauses)
+                db.session.commit()
+                batch, pauses = [], []
+            day += timedelta(days=1)
+        if batch:
+            db.session.execute(LogEntry.__table__.insert(), batch)
+            if pauses:
+                db.session.execute(Pause.__table__.insert(), pauses)
+            db.session.commit()
+        rebuild_rollup(user.id)
+        created.append((username, user.id))
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('log_entry', 'id'), "
+                                "(SELECT MAX(id) FROM log_entry))"))
+        db.session.commit()
+    return created
+
+
+def seed_team(user_ids, shared_projects=2):
+    """
+    Založí tým ze zadaných uživatelů (první je manažer) a s týmem sdílí
+    jejich `shared_projects` nejčastěji používaných projektů (první
+    vytvořené – váhy v seed_users klesají s pořadím). Vrací id týmu.
+    """
+    from models import db, Project, Team, TeamMembership
+
+    team = Team(name='Bench tým')
+    for i, user_id in enumerate(user_ids):
+        team.memberships.append(TeamMembership(user_id=user_id, role='manager' if i == 0 else 'member'))
+    db.session.add(team)
+    db.session.flush()
+    for user_id in user_ids:
+        project_ids = [project_id for project_id, in db.session.query(Project.id)
+                       .filter(Project.user_id == user_id).order_by(Project.id).limit(shared_projects)]
+        Project.query.filter(Project.id.in_(project_ids)).update({'team_id': team.id})
+    db.session.commit()
+    return team.id
+
+
+def login(app, username=BENCH_USER):
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': username})
+    return client
@@ -0,0 +1,130 @@
+"""
+Zátěžový test běžícího serveru: požadavky za sekundu a latence pro
+/api/logs (okno kalendáře) a /api/reports.
+
+Bez --base-url si skript sám připraví dočasnou SQLite databázi se
+syntetickými daty a spustí nad ní gunicorn s gunicorn.conf.py (worker
+class a počty workerů/vláken se řídí proměnnými WEB_*). S --base-url
+zatěžuje už běžící instanci (např. proti MySQL v kontejneru).
+
+    python benchmarks/load_test.py --rows 50000 --concurrency 16 --duration 10
+    python benchmarks/load_test.py --base-url http://localhost:5000 --user admin --password admin
+"""
+import argparse
+import http.cookiejar
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from common import ROOT, BENCH_USER, use_temp_database, seed
+
+ENDPOINTS = [
+    ('/api/logs', '/api/logs?start=2016-02-29T00:00:00&end=2016-04-11T00:00:00'),
+    ('/api/reports', '/api/reports?period=daily&start_date=2016-01-01&end_date=2016-12-31'),
+]
+
+
+def make_opener(base_url, user, password):
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({'username': user, 'password': password}).encode()
+    opener.open(base_url + '/login', data=data).read()
+    return opener
+
+
+def wait_for(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/login').read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError('Server na %s nenaběhl.' % base_url)
+
+
+def run_load(base_url, path, user, password, concurrency, duration):
+    timings = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def worker():
+        opener = make_opener(base_url, user, password)
+        local = []
+        failed = 0
+        while time.time() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                opener.open(base_url + path).read()
+            except urllib.error.URLError:
+                failed += 1
+                continue
+            local.append((time.perf_counter() - t0) * 1000.0)
+        with lock:
+            timings.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+    return len(timings) / elapsed, timings, errors[0]
+
+
+def start_server(rows, port):
+    db_path = use_temp_database()
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        seed(rows)
+    env = dict(os.environ, WEB_BIND='127.0.0.1:%d' % port)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return server, db_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url')
+    parser.add_argument('--user', default=BENCH_USER)
+    parser.add_argument('--password', default=BENCH_USER)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, db_path = start_server(args.rows, args.port)
+        base_url = 'http://127.0.0.1:%d' % args.port
+    try:
+        wait_for(base_url)
+        for name, path in ENDPOINTS:
+            rps, timings, errors = run_load(base_url, path, args.user, args.password,
+                                            args.concurrency, args.duration)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95)] if timings else 0.0
+            print('%-10s %8.1f req/s  p50 %7.2f ms  p95 %7.2f ms  chyb %d' % (
+                name, rps, statistics.median(timings) if timings else 0.0, p95, errors))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+            os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Hromadný import záznamů (JSON API /api/logs/batch a nahrání CSV/XLSX).
+
+Řádky se nejdřív všechny zvalidují, názvy projektů se přeloží na id jedním
+dotazem a platné řádky se vkládají přes executemany po dávkách – každá dávka
+ve vlastní transakci, včetně úpravy daily_rollup a revize dat uživatele.
+Výsledkem je počet vložených řádků a seznam chyb po řádcích.
+"""
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, LogEntry, Project, worked_minutes, interval_minutes, pauses_error
+from revisions import mark_user_changed
+from teams import accessible_projects
+import rollup
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Hlavičky souborů -> klíče řádku (anglické klíče API i české popisky exportu)
+COLUMN_ALIASES = {
+    'project_id': 'project_id',
+    'project': 'project', 'projekt': 'project',
+    'start': 'start', 'start_time': 'start', 'začátek': 'start',
+    'end': 'end', 'end_time': 'end', 'konec': 'end',
+    'pause_start': 'pause_start', 'start pauzy': 'pause_start',
+    'pause_end': 'pause_end', 'konec pauzy': 'pause_end',
+    # souhrnný sloupec exportu – jednotlivé pauzy v něm nejsou
+    'pause_hours': 'pause_hours', 'pauza (hod)': 'pause_hours',
+    'note': 'note', 'poznámka': 'note',
+}
+
+
+class RowError(ValueError):
+    """Chyba jednoho řádku importu (zpráva jde přímo uživateli)."""
+
+
+def _parse_time(value, field, required=False):
+    if value is None or value == '':
+        if required:
+            raise RowError('Chybí %s.' % field)
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        text = str(value).strip()
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        return datetime.fromisoformat(text).replace(tzinfo=None)
+    except ValueError:
+        raise RowError('Neplatný čas v poli %s: %r' % (field, value))
+
+
+def _validate(row, project_ids, project_names):
+    """
+    Z jednoho vstupního řádku udělá hodnoty pro INSERT, nebo vyhodí RowError.
+    """
+    if not isinstance(row, dict):
+        raise RowError('Řádek musí být objekt.')
+    project_id = row.get('project_id')
+    if project_id not in (None, ''):
+        try:
+            project_id = int(project_id)
+        except (TypeError, ValueError):
+            raise RowError('Neplatné project_id: %r' % project_id)
+        if project_id not in project_ids:
+            raise RowError('Projekt %d neexistuje.' % project_id)
+    else:
+        name = (row.get('project') or '').strip()
+        if not name:
+            raise RowError('Chybí projekt.')
+        if name not in project_names:
+            raise RowError('Projekt "%s" neexistuje.' % name)
+        project_id = project_names[name]
+
+    start = _parse_time(row.get('start'), 'start', required=True)
+    # běžící činnosti vznikají jen přes Start (active_timer), import nese hotové záznamy
+    end = _parse_time(row.get('end'), 'end', required=True)
+    if end and end < start:
+        raise RowError('Konec je před začátkem.')
+    pauses = _validate_pauses(row, start, end)
+    note = row.get('note')
+    paused = sum(interval_minutes(pause_start, pause_end) for pause_start, pause_end in pauses)
+    return {
+        'project_id': project_id,
+        'start_time': start,
+        'end_time': end,
+        'note': str(note) if note not in (None, '') else None,
+        # Core insert obchází validátor modelu – délku počítáme sami
+        'paused_minutes': paused,
+        'worked_minutes': worked_minutes(start, end, paused),
+        'pauses': pauses,
+    }
+
+
+def _validate_pauses(row, start, end):
+    """
+    Pauzy řádku: JSON klíč `pauses` (seznam {start, end}), jedna pauza
+    ze sloupců pause_start/pause_end, nebo jen její délka v hodinách
+    (pause_hours, sloupec "Pauza (hod)" z exportu). Vrací seznam dvojic
+    (start, konec).
+    """
+    if row.get('pauses'):
+        if not isinstance(row['pauses'], list):
+            raise RowError('Pole pauses musí být seznam.')
+        raw = [(pause.get('start'), pause.get('end')) if isinstance(pause, dict) else (None, None)
+               for pause in row['pauses']]
+    elif row.get('pause_start') in (None, '') and row.get('pause_end') in (None, ''):
+        return _pause_from_hours(row.get('pause_hours'), start, end)
+    else:
+        raw = [(row.get('pause_start'), row.get('pause_end'))]
+    pauses = []
+    for raw_start, raw_end in raw:
+        pause_start = _parse_time(raw_start, 'pause_start')
+        pause_end = _parse_time(raw_end, 'pause_end')
+        if not pause_start and not pause_end:
+            continue
+        if not pause_start:
+            raise RowError('Konec pauzy bez startu pauzy.')
+        pauses.append((pause_start, pause_end))
+    # pauza bez konce, mimo záznam a překryvy – stejná pravidla jako při úpravě záznamu
+    error = pauses_error(start, end, pauses)
+    if error:
+        raise RowError(error)
+    return pauses
+
+
+def _pause_from_hours(value, start, end):
+    """
+    Export nese jen součet pauz záznamu. Při zpětném importu z něj vznikne
+    jedna pauza stejné délky (na celé minuty) uprostřed záznamu, takže
+    odpracované hodiny sedí s exportem.
+    """
+    if value in (None, ''):
+        return []
+    try:
+        minutes = round(float(str(value).replace(',', '.')) * 60)
+    except ValueError:
+        raise RowError('Neplatná délka pauzy: %r' % value)
+    if minutes < 0:
+        raise RowError('Délka pauzy nesmí být záporná.')
+    if not minutes:
+        return []
+    if minutes > interval_minutes(start, end):
+        raise RowError('Pauza je delší než záznam.')
+    pause_start = start + (end - start - timedelta(minutes=minutes)) / 2
+    return [(pause_start, pause_start + timedelta(minutes=minutes))]
+
+
+def _insert_chunk(user_id, values):
+    # Záznamy s pauzami potřebují id pro tabulku pause, jdou proto přes ORM
+    # (daily_rollup i revizi pak obslouží listenery); ostatní executemany.
+    plain = []
+    for item in values:
+        pauses = item.pop('pauses')
+        if pauses:
+            entry = LogEntry(user_id=user_id, project_id=item['project_id'],
+                             start_time=item['start_time'], end_time=item['end_time'],
+                             note=item['note'])
+            entry.set_pauses(pauses)
+            db.session.add(entry)
+        else:
+            plain.append(item)
+
+    deltas = defaultdict(lambda: [0.0, 0])
+    for item in plain:
+        contribution = rollup.entry_contribution(
+            user_id, item['project_id'], item['start_time'], item['worked_minutes'])
+        if contribution:
+            key, minutes = contribution
+            deltas[key][0] += minutes
+            deltas[key][1] += 1
+    if plain:
+        db.session.execute(LogEntry.__table__.insert(), plain)
+        rollup.apply_deltas(db.session, {key: tuple(value) for key, value in deltas.items()})
+        mark_user_changed(db.session, user_id)
+    db.session.commit()
+
+
+def import_rows(user_id, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Naimportuje řádky (dicty s klíči project_id|project, start, end,
+    pause_start, pause_end nebo pauses, note) pro uživatele. Vrací
+    {'inserted': n, 'errors': [{'row': index, 'error': zpráva}, ...]};
+    index je pořadí řádku ve vstupu od 0.
+    """
+    # vlastní i sdílené projekty týmů uživatele
+    projects = accessible_projects(user_id).with_entities(Project.id, Project.name).all()
+    project_ids = {project_id for project_id, name in projects}
+    project_names = {name: project_id for project_id, name in projects}
+
+    errors = []
+    valid = []
+    for index, row in enumerate(rows):
+        try:
+            item = _validate(row, project_ids, project_names)
+        except RowError as exc:
+            errors.append({'row': index, 'error': str(exc)})
+            continue
+        item['user_id'] = user_id
+        valid.append((index, item))
+
+    inserted = 0
+    for offset in range(0, len(valid), chunk_size):
+        chunk = valid[offset:offset + chunk_size]
+        try:
+            _insert_chunk(user_id, [item for index, item in chunk])
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            message = 'Chyba databáze: %s' % exc.__class__.__name__
+            errors.extend({'row': index, 'error': message} for index, item in chunk)
+            continue
+        inserted += len(chunk)
+
+    errors.sort(key=lambda error: error['row'])
+    return {'inserted': inserted, 'errors': errors}
+
+
+def _normalize_header(header):
+    key = str(header or '').strip().lower()
+    return COLUMN_ALIASES.get(key)
+
+
+def _rows_from_table(table_rows):
+    table_rows = iter(table_rows)
+    header = next(table_rows, None)
+    if header is None:
+        return []
+    keys = [_normalize_header(h) for h in header]
+    rows = []
+    for values in table_rows:
+        if not any(v not in (None, '') for v in values):
+            continue
+        rows.append({key: value for key, value in zip(keys, values) if key})
+    return rows
+
+
+def read_upload(file_storage):
+    """
+    Načte řádky z nahraného CSV nebo XLSX (první list). První řádek je hlavička.
+    """
+    filename = (file_storage.filename or '').lower()
+    if filename.endswith('.xlsx'):
+        from openpyxl import load_workbook  # jen pro import z Excelu
+        workbook = load_workbook(file_storage.stream, read_only=True, data_only=True)
+        try:
+            return _rows_from_table(workbook.worksheets[0].iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    if filename.endswith('.csv'):
+        text = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        return _rows_from_table(csv.reader(text, dialect))
+    raise ValueError('Podporované jsou soubory .csv a .xlsx.')
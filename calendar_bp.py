@@ -1,7 +1,15 @@
-from flask import Blueprint, jsonify, request, abort
+from flask import Blueprint, jsonify, request, abort, url_for
 from flask_login import login_required, current_user
-from models import db, LogEntry, Project
-from datetime import datetime
+from models import db, LogEntry, Project, ActiveTimer, Pause, Job
+from datetime import datetime, date
+from bulk_import import import_rows
+import jobs
+import report_cache
+from reports import build_report
+from sql_funcs import PERIODS
+from archive import entries_source
+from revisions import get_revision, make_etag, not_modified, add_validators
+from teams import can_log_to
 
 bp = Blueprint('calendar_api', __name__, url_prefix='/api')
 
@@ -11,21 +19,74 @@ def to_local_str(dt):
     """
     return dt.isoformat() if dt else None
 
+def parse_range_param(value):
+    """
+    Přijme hranici okna z FullCalendaru (ISO string, případně s offsetem
+    nebo 'Z') a vrátí naive datetime v lokálním čase, jak jsou uložené záznamy.
+    """
+    if not value:
+        return None
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        abort(400)
+
 @bp.route('/logs', methods=['GET'])
 @login_required
 def get_logs():
-    entries = LogEntry.query.filter_by(user_id=current_user.id).all()
+    # FullCalendar posílá viditelné okno jako ?start=...&end=...
+    range_start = parse_range_param(request.args.get('start'))
+    range_end   = parse_range_param(request.args.get('end'))
+
+    # Podmíněný GET: když se data uživatele od minula nezměnila, stačí 304
+    revision, updated_at = get_revision(current_user.id)
+    etag = make_etag(current_user.id, revision, 'api-logs', range_start, range_end)
+    cached = not_modified(etag, updated_at)
+    if cached is not None:
+        return cached
+
+    # Jen sloupce, které kalendář potřebuje – bez hydratace ORM objektů.
+    # Překryv s oknem: záznam začal před koncem okna a skončil po jeho začátku
+    # (běžící záznamy bez konce zasahují do všech pozdějších oken); staré okno
+    # sáhne i do ročních archivů.
+    entries = entries_source(current_user.id, range_start, range_end, overlap=True)
+    query = db.session.query(
+        entries.c.id,
+        entries.c.note,
+        entries.c.project_id,
+        entries.c.start_time,
+        entries.c.end_time,
+        entries.c.archived
+    )
+
     events = []
-    for e in entries:
-        events.append({
-            'id': e.id,
-            'title': e.note or '—',
-            'project_id': e.project_id,
-            'start': to_local_str(e.start_time),
-            'end':   to_local_str(e.end_time),
-            'note':  e.note
-        })
-    return jsonify(events)
+    for entry_id, note, project_id, start_time, end_time, archived in query:
+        event = {
+            'id': entry_id,
+            'title': note or '—',
+            'project_id': project_id,
+            'start': to_local_str(start_time),
+            'end':   to_local_str(end_time),
+            'note':  note
+        }
+        if archived:
+            # archivované záznamy jsou jen pro čtení
+            event['editable'] = False
+        events.append(event)
+    return add_validators(jsonify(events), etag, updated_at)
+
+def project_id_param(data):
+    """project_id z těla požadavku; cizí projekt (mimo týmy uživatele) je 403."""
+    try:
+        project_id = int(data['project_id'])
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+    if not can_log_to(current_user.id, project_id):
+        abort(403)
+    return project_id
+
 
 @bp.route('/logs', methods=['POST'])
 @login_required
@@ -33,7 +94,7 @@ def create_log():
     data = request.get_json()
     e = LogEntry(
       user_id=current_user.id,
-      project_id = data['project_id'],
+      project_id = project_id_param(data),
       start_time = datetime.fromisoformat(data['start']),
       end_time   = datetime.fromisoformat(data['end']),
       note       = data.get('note')
@@ -42,6 +103,100 @@ def create_log():
     db.session.commit()
     return jsonify({'id': e.id}), 201
 
+@bp.route('/logs/batch', methods=['POST'])
+@login_required
+def create_logs_batch():
+    """
+    Hromadné vložení záznamů: seznam objektů (nebo {"rows": [...]}) s klíči
+    project_id nebo project (název), start, end, pause_start, pause_end
+    nebo pauses ([{"start", "end"}, ...]), note.
+    """
+    data = request.get_json(silent=True)
+    rows = data.get('rows') if isinstance(data, dict) else data
+    if not isinstance(rows, list):
+        return jsonify({'error': 'Očekáván seznam záznamů.'}), 400
+    result = import_rows(current_user.id, rows)
+    status = 201 if result['inserted'] else 400
+    return jsonify(result), status
+
+@bp.route('/timer', methods=['GET'])
+@login_required
+def get_timer():
+    """
+    Běžící činnosti uživatele – levný dotaz nad malou tabulkou active_timer,
+    vhodný pro pravidelné dotazování z UI.
+    """
+    paused = db.session.query(Pause.id).filter(Pause.log_entry_id == LogEntry.id,
+                                               Pause.end_time.is_(None)).exists()
+    rows = db.session.query(
+        ActiveTimer.project_id,
+        Project.name,
+        LogEntry.id,
+        LogEntry.start_time,
+        paused
+    ).join(Project, Project.id == ActiveTimer.project_id) \
+     .join(LogEntry, LogEntry.id == ActiveTimer.log_entry_id) \
+     .filter(ActiveTimer.user_id == current_user.id).all()
+    return jsonify([{
+        'project_id': project_id,
+        'project_name': project_name,
+        'log_id': log_id,
+        'start': to_local_str(start_time),
+        'paused': bool(paused)
+    } for project_id, project_name, log_id, start_time, paused in rows])
+
+@bp.route('/reports', methods=['GET'])
+@login_required
+def get_reports():
+    """
+    Sloupcová data reportu (labels + hodiny po projektech) pro zadané období,
+    rozsah dní a projekt. Stránka /reports je načítá asynchronně, takže změna
+    filtru přenáší jen agregovaná čísla.
+    """
+    period     = request.args.get('period', 'monthly')
+    project_id = request.args.get('project_id') or 'all'
+    start_date = request.args.get('start_date') or None
+    end_date   = request.args.get('end_date') or None
+    if period not in PERIODS or (project_id != 'all' and not project_id.isdigit()):
+        abort(400)
+    try:
+        for value in (start_date, end_date):
+            if value:
+                date.fromisoformat(value)
+    except ValueError:
+        abort(400)
+
+    revision, updated_at = get_revision(current_user.id)
+    etag = make_etag(current_user.id, revision, 'api-reports', period, project_id, start_date, end_date)
+    cached = not_modified(etag, updated_at)
+    if cached is not None:
+        return cached
+
+    # cache po uživatelích, dokud se jejich data nezmění (jiný klíč než dřívější
+    # data grafu – sdílená cache může ještě držet starý tvar)
+    data = report_cache.cached_report(
+        current_user.id,
+        revision,
+        ('api-reports', period, project_id, start_date, end_date),
+        lambda: build_report(current_user.id, period, project_id, start_date, end_date)
+    )
+    return add_validators(jsonify(data), etag, updated_at)
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    """Stav úlohy na pozadí (viz jobs.py) pro dotazování z UI."""
+    job = db.session.get(Job, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    if job.status == 'queued':
+        # úlohu mohl zařadit worker, který mezitím skončil
+        jobs.kick()
+    data = jobs.job_to_dict(job)
+    if data['download']:
+        data['download_url'] = url_for('main.download_job', job_id=job.id)
+    return jsonify(data)
+
 @bp.route('/logs/<int:id>', methods=['PUT'])
 @login_required
 def update_log(id):
@@ -49,10 +204,21 @@ def update_log(id):
     if e.user_id != current_user.id:
         abort(403)
     data = request.get_json()
-    e.project_id = data['project_id']
+    # záznam na projektu, ke kterému uživatel ztratil přístup, jde dál
+    # posouvat – nový projekt ale musí být dostupný
+    if str(data.get('project_id')) != str(e.project_id):
+        e.project_id = project_id_param(data)
     e.start_time = datetime.fromisoformat(data['start'])
     e.end_time   = datetime.fromisoformat(data['end'])
     e.note       = data.get('note')
+    # Po přesunu/zkrácení v kalendáři by pauzy mohly ležet mimo záznam
+    # a odečítat se od cizího času – ponecháme jen dokončené pauzy uvnitř
+    inside = [(p.start_time, p.end_time) for p in e.pauses
+              if p.end_time and e.start_time <= p.start_time and p.end_time <= e.end_time]
+    if len(inside) != len(e.pauses):
+        e.set_pauses(inside)
+    # záznam má teď konec – pokud běžel, timer končí
+    e.active_timer = None
     db.session.commit()
     return jsonify({'status':'ok'})
 
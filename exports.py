@@ -0,0 +1,184 @@
+"""
+Export záznamů do CSV a Excelu.
+
+Stejné funkce používají synchronní routy (/export/csv, /export/excel), které
+posílají soubor rovnou v odpovědi, i úlohy na pozadí (jobs.py), které ho
+zapíší na disk ke stažení později. Nic tu proto nesahá na request ani
+current_user – uživatel se předává parametrem.
+
+xlsxwriter se načítá až při prvním Excel exportu, aby import aplikace
+(start workeru, CLI) nestál jeho načtení.
+"""
+import csv
+import io
+from datetime import datetime, timedelta
+
+from models import db, Project
+from archive import entries_source
+from instrumentation import record_export_rows
+
+ALL_COLUMNS = [
+    ("id", "ID"),
+    ("project", "Projekt"),
+    ("start_time", "Začátek"),
+    ("end_time", "Konec"),
+    ("pause", "Pauza (hod)"),
+    ("note", "Poznámka"),
+    ("hours", "Odpracované hodiny")
+]
+
+CSV_BATCH_SIZE = 1000          # počet řádků načítaných z kurzoru najednou
+CSV_FLUSH_BYTES = 64 * 1024    # velikost bloku odesílaného klientovi
+
+CSV_MIMETYPE = "text/csv"
+EXCEL_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def select_columns(selected_columns):
+    """
+    Vybrané sloupce (prázdný výběr = všechny) a jejich hlavičky; pořadí vždy
+    podle ALL_COLUMNS.
+    """
+    columns = [key for key, label in ALL_COLUMNS if not selected_columns or key in selected_columns]
+    headers = [label for key, label in ALL_COLUMNS if key in columns]
+    return columns, headers
+
+
+def export_rows_query(user_id, project_id, month):
+    """
+    Řádky exportu (projekt, měsíc) včetně archivovaných záznamů, seřazené
+    od nejnovějších: id, název projektu, začátek, konec, minuty pauz,
+    poznámka a uložené odpracované minuty. Název projektu přes JOIN.
+    """
+    range_start = range_end = None
+    if month:
+        range_start = datetime.strptime(month, '%Y-%m')
+        # první den následujícího měsíce
+        range_end = (range_start + timedelta(days=32)).replace(day=1)
+    entries = entries_source(user_id, range_start, range_end)
+    query = db.session.query(
+        entries.c.id,
+        Project.name,
+        entries.c.start_time,
+        entries.c.end_time,
+        entries.c.paused_minutes,
+        entries.c.note,
+        entries.c.worked_minutes
+    ).join(Project, Project.id == entries.c.project_id)
+    if project_id and project_id.lower() != 'all':
+        query = query.filter(entries.c.project_id == int(project_id))
+    # yield_per zapne stream_results – řádky tečou ze serverového kurzoru po dávkách
+    return query.order_by(entries.c.start_time.desc()).yield_per(CSV_BATCH_SIZE)
+
+
+def format_csv_time(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+def iter_csv(user_id, project_id, month, selected_columns):
+    """
+    CSV export po blocích (řetězce o velikosti ~CSV_FLUSH_BYTES).
+    """
+    columns, headers = select_columns(selected_columns)
+    rows = export_rows_query(user_id, project_id, month)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM, aby Excel správně otevřel diakritiku
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    row_count = 0
+    for log_id, project_name, start_time, end_time, paused, note, minutes in rows:
+        row_count += 1
+        values = {
+            'id': log_id,
+            'project': project_name or '',
+            'start_time': format_csv_time(start_time),
+            'end_time': format_csv_time(end_time),
+            'pause': round(paused / 60.0, 2),
+            'note': note or '',
+            'hours': round(minutes / 60.0, 2)
+        }
+        writer.writerow([values[key] for key in columns])
+        if buffer.tell() >= CSV_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+    record_export_rows('csv', row_count)
+
+
+def write_excel(user_id, project_id, month, selected_columns, output):
+    """
+    Zapíše Excel export do souborového objektu `output`.
+    """
+    import xlsxwriter
+    from xlsxwriter.utility import xl_rowcol_to_cell
+
+    columns, headers = select_columns(selected_columns)
+    # Jeden dotaz: název projektu přes JOIN, hodiny z uloženého worked_minutes
+    rows = export_rows_query(user_id, project_id, month)
+
+    # constant_memory: každý dopsaný řádek se odkládá do dočasného souboru,
+    # výsledný .xlsx se skládá do `output` (ne do paměti)
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet("Dochazka")
+
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#DCE6F1'})
+    datetime_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+    hours_format = workbook.add_format({'num_format': '0.00'})
+    sum_format = workbook.add_format({'bold': True, 'num_format': '0.00'})
+
+    for col_idx, key in enumerate(columns):
+        if key in ('start_time', 'end_time'):
+            worksheet.set_column(col_idx, col_idx, 17)
+        elif key in ('project', 'note'):
+            worksheet.set_column(col_idx, col_idx, 30)
+    # hlavičky
+    for col_idx, header in enumerate(headers):
+        worksheet.write_string(0, col_idx, header, header_format)
+
+    total_hours_sum = 0.0
+    row_idx = 1
+    for log_id, project_name, start_time, end_time, paused, note, minutes in rows:
+        hours = round(minutes / 60.0, 2)
+        total_hours_sum += hours
+        values = {
+            'id': log_id,
+            'project': project_name,
+            'start_time': start_time,
+            'end_time': end_time,
+            'pause': round(paused / 60.0, 2),
+            'note': note,
+            'hours': hours
+        }
+        # zapíšeme řádek s nativními typy buněk
+        for col, key in enumerate(columns):
+            val = values[key]
+            if val is None:
+                continue
+            if key in ('start_time', 'end_time'):
+                worksheet.write_datetime(row_idx, col, val, datetime_format)
+            elif key in ('hours', 'pause'):
+                worksheet.write_number(row_idx, col, val, hours_format)
+            elif key == 'id':
+                worksheet.write_number(row_idx, col, val)
+            else:
+                worksheet.write_string(row_idx, col, val)
+        row_idx += 1
+
+    # Přidáme na konec řádek se součtem hodin (vzorec + předpočítaná hodnota)
+    if 'hours' in columns:
+        hours_col = columns.index('hours')
+        worksheet.write_string(row_idx, 0, "Celkem hodin", sum_format)
+        if row_idx > 1:
+            worksheet.write_formula(
+                row_idx, hours_col,
+                '=SUM(%s:%s)' % (xl_rowcol_to_cell(1, hours_col), xl_rowcol_to_cell(row_idx - 1, hours_col)),
+                sum_format, round(total_hours_sum, 2)
+            )
+        else:
+            worksheet.write_number(row_idx, hours_col, 0, sum_format)
+
+    workbook.close()
+    record_export_rows('excel', row_idx - 1)
@@ -0,0 +1,47 @@
+"""
+Konfigurace gunicornu, volitelná proměnnými prostředí:
+
+    WEB_BIND           adresa (výchozí 0.0.0.0:5000)
+    WEB_WORKER_CLASS   sync | gthread | gevent (výchozí gthread)
+    WEB_CONCURRENCY    počet procesů (výchozí 2 * CPU + 1)
+    WEB_THREADS        vláken na proces pro gthread (výchozí 4)
+    WEB_TIMEOUT        timeout požadavku v sekundách (výchozí 60)
+
+gevent vyžaduje doinstalovat balíček gevent (PyMySQL je čistý Python,
+takže po monkey-patchi spolupracuje). Pool spojení (DB_POOL_SIZE,
+DB_MAX_OVERFLOW) je per proces – celkový počet spojení k MySQL je
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+
+S METRICS_ENABLED=1 a více workery sčítá /metrics čísla všech workerů
+přes METRICS_DIR (výchozí adresář v dočasném adresáři systému), který
+se při startu vyprázdní – viz instrumentation.py.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4)) if worker_class == 'gthread' else 1
+if worker_class == 'gevent':
+    worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 100))
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+
+if os.environ.get('METRICS_ENABLED', '0') == '1' and workers > 1:
+    # workery aplikaci načítají až po forku a dědí prostředí mastera
+    os.environ.setdefault('METRICS_DIR',
+                          os.path.join(tempfile.gettempdir(), 'dochazka-metrics'))
+
+
+def on_starting(server):
+    # čísla z minulého běhu by se přičetla k novým
+    directory = os.environ.get('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+            os.remove(path)
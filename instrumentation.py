@@ -0,0 +1,356 @@
+"""
+Měření horké cesty: doby odpovědí, SQL dotazy, exporty.
+
+Každý příkaz odeslaný do databáze během požadavku se započítá do flask.g
+(počet i čas). Při SQL_QUERY_COUNT_HEADER = True se počet vrací v hlavičce
+X-SQL-Queries, takže lze snadno ověřit, kolik dotazů která routa stojí
+(např. že load_user na horké cestě do databáze nesahá).
+
+Souhrnné metriky (histogramy latence a velikosti odpovědí po endpointech,
+počty a doby SQL příkazů, počty exportovaných řádků, doby úloh na pozadí)
+se drží v paměti procesu a vystavují ve formátu Prometheus na /metrics.
+Endpoint je ve výchozím stavu vypnutý (METRICS_ENABLED) a nemá přihlášení
+uživatele; s METRICS_TOKEN vyžaduje hlavičku `Authorization: Bearer
+<token>`, jinak ho je třeba schovat za proxy.
+
+Gunicorn workery sdílí jeden port a scrape dojde do náhodného z nich,
+Prometheus je tedy jednotlivě neodliší. S METRICS_DIR (gunicorn.conf.py
+ho při více workerech nastaví sám) proto každý proces každých
+METRICS_FLUSH_SECONDS zapíše svá čísla do souboru v tomto adresáři
+a /metrics vrací součet všech souborů – i po workerech, které mezitím
+skončily, aby čítače neklesaly. Čísla ostatních workerů jsou tak nejvýš
+o interval starší. Adresář musí být společný všem workerům instance
+a gunicorn ho při startu vyprázdní.
+
+Požadavky delší než SLOW_REQUEST_SECONDS se zapíšou do logu i s
+nejpomalejšími SQL příkazy.
+"""
+import atexit
+import glob
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import abort, g, has_request_context, request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# kolik nejpomalejších příkazů si požadavek pamatuje pro slow log
+SLOW_LOG_STATEMENTS = 10
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{%s}' % ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+    def snapshot(self):
+        """Kopie hodnot {klíč štítků: hodnota} pro zápis do METRICS_DIR."""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def render(self, values=None):
+        lines = ['# HELP %s %s' % (self.name, self.documentation),
+                 '# TYPE %s %s' % (self.name, self.kind)]
+        for key, value in sorted((values if values is not None else self.snapshot()).items()):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _copy(self, value):
+        return value
+
+    def _add(self, total, value):
+        return (total or 0) + value
+
+    def _render_value(self, key, value):
+        return ['%s%s %s' % (self.name, self._format_labels(key), _number(value))]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [počty po bucketech..., součet, počet]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _copy(self, state):
+        return list(state)
+
+    def _add(self, total, state):
+        if total is None or len(total) != len(state):
+            return list(state)
+        return [a + b for a, b in zip(total, state)]
+
+    def _render_value(self, key, state):
+        lines = []
+        for bound, count in zip(self.buckets, state):
+            lines.append('%s_bucket%s %d' % (self.name, self._format_labels(key, [('le', _number(bound))]), count))
+        lines.append('%s_bucket%s %d' % (self.name, self._format_labels(key, [('le', '+Inf')]), state[-1]))
+        lines.append('%s_sum%s %s' % (self.name, self._format_labels(key), _number(state[-2])))
+        lines.append('%s_count%s %d' % (self.name, self._format_labels(key), state[-1]))
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = []
+
+REQUEST_LATENCY = Histogram(
+    'dochazka_http_request_duration_seconds',
+    'Doba zpracování požadavku včetně odeslání těla odpovědi.',
+    ('endpoint', 'method', 'status'))
+RESPONSE_SIZE = Histogram(
+    'dochazka_http_response_size_bytes', 'Velikost těla odpovědi.',
+    ('endpoint',), buckets=SIZE_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    'dochazka_http_request_sql_queries', 'Počet SQL příkazů na požadavek.',
+    ('endpoint',), buckets=COUNT_BUCKETS)
+SQL_DURATION = Histogram(
+    'dochazka_sql_statement_duration_seconds', 'Doba SQL příkazu.',
+    ('operation',), buckets=SQL_BUCKETS)
+EXPORT_ROWS = Counter(
+    'dochazka_export_rows_total', 'Počet exportovaných řádků.', ('format',))
+JOB_DURATION = Histogram(
+    'dochazka_job_duration_seconds', 'Doba běhu úlohy na pozadí.', ('kind', 'status'))
+
+
+def _operation(statement):
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else ''
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_start'].pop()
+    elapsed = time.perf_counter() - started
+    SQL_DURATION.observe(elapsed, operation=_operation(statement))
+    if has_request_context():
+        g.sql_time = g.get('sql_time', 0.0) + elapsed
+        if 'slow_statements' in g:
+            statements = g.slow_statements
+            statements.append((elapsed, statement))
+            if len(statements) > SLOW_LOG_STATEMENTS * 2:
+                statements.sort(key=lambda item: item[0], reverse=True)
+                del statements[SLOW_LOG_STATEMENTS:]
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_failed_statement(context):
+    # after_cursor_execute se po chybě nezavolá – uklidíme začátek měření
+    if context.connection is not None and context.connection.info.get('query_start'):
+        context.connection.info['query_start'].pop()
+
+
+def query_count():
+    """Počet SQL příkazů v aktuálním požadavku."""
+    return g.get('sql_queries', 0)
+
+
+def record_export_rows(export_format, rows):
+    EXPORT_ROWS.inc(rows, format=export_format)
+
+
+# soubor tohoto procesu v METRICS_DIR; pid samotný by se po restartu workeru
+# mohl opakovat a přepsat čísla skončeného workeru
+_store = {'dir': None, 'interval': 5.0, 'pid': None, 'path': None, 'flusher_pid': None}
+_store_lock = threading.Lock()
+
+
+def _process_path():
+    pid = os.getpid()
+    if _store['pid'] != pid:
+        _store['pid'] = pid
+        name = 'metrics-%d-%s.json' % (pid, uuid.uuid4().hex[:8])
+        _store['path'] = os.path.join(_store['dir'], name)
+    return _store['path']
+
+
+def flush_metrics():
+    """Zapíše čísla tohoto procesu do METRICS_DIR (atomicky přes přejmenování)."""
+    if not _store['dir']:
+        return
+    data = {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for metric in REGISTRY}
+    with _store_lock:
+        path = _process_path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.replace(path + '.tmp', path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_store['interval'])
+        try:
+            flush_metrics()
+        except OSError:
+            logger.exception('Zápis metrik do %s selhal', _store['dir'])
+
+
+def _ensure_flusher():
+    # vlákno patří procesu – po forku gunicorn workeru vznikne znovu
+    if _store['dir'] and _store['flusher_pid'] != os.getpid():
+        _store['flusher_pid'] = os.getpid()
+        threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _collected_values():
+    """Součet hodnot všech procesů z METRICS_DIR: {jméno metriky: {klíč: hodnota}}."""
+    flush_metrics()
+    totals = {metric.name: {} for metric in REGISTRY}
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for path in glob.glob(os.path.join(_store['dir'], 'metrics-*.json')):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # soubor mezitím zmizel nebo je z jiné verze – přeskočíme
+            continue
+        for name, items in data.items():
+            metric = by_name.get(name)
+            if metric is None:
+                continue
+            values = totals[name]
+            for key, value in items:
+                key = tuple(key)
+                values[key] = metric._add(values.get(key), value)
+    return totals
+
+
+def render_metrics():
+    collected = _collected_values() if _store['dir'] else {}
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(collected.get(metric.name)))
+    return '\n'.join(lines) + '\n'
+
+
+def _counting_body(body, counter):
+    for chunk in body:
+        counter[0] += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        yield chunk
+
+
+def init_app(app):
+    slow_seconds = app.config.get('SLOW_REQUEST_SECONDS') or 0
+    if app.config.get('METRICS_ENABLED') and app.config.get('METRICS_DIR'):
+        _store['dir'] = app.config['METRICS_DIR']
+        _store['interval'] = app.config.get('METRICS_FLUSH_SECONDS', 5.0)
+        os.makedirs(_store['dir'], exist_ok=True)
+        atexit.register(flush_metrics)
+
+    @app.before_request
+    def _start_timer():
+        _ensure_flusher()
+        g.request_started = time.perf_counter()
+        if slow_seconds:
+            g.slow_statements = []
+
+    @app.after_request
+    def _observe(response):
+        if app.config.get('SQL_QUERY_COUNT_HEADER'):
+            response.headers['X-SQL-Queries'] = str(query_count())
+        started = g.get('request_started')
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unknown'
+        method = request.method
+        path = request.path
+        status = response.status_code
+        # g patří aplikačnímu kontextu; čte se až po odeslání celého těla
+        ctx_g = g._get_current_object()
+        size = [response.content_length]
+        if size[0] is None and not response.direct_passthrough and not response.is_sequence:
+            # streamované tělo (CSV export) – velikost sečteme při odesílání
+            size = [0]
+            response.response = _counting_body(response.response, size)
+
+        def _finish():
+            elapsed = time.perf_counter() - started
+            queries = ctx_g.get('sql_queries', 0)
+            REQUEST_LATENCY.observe(elapsed, endpoint=endpoint, method=method, status=status)
+            REQUEST_QUERIES.observe(queries, endpoint=endpoint)
+            if size[0] is not None:
+                RESPONSE_SIZE.observe(size[0], endpoint=endpoint)
+            if slow_seconds and elapsed >= slow_seconds:
+                statements = sorted(ctx_g.get('slow_statements', []),
+                                    key=lambda item: item[0], reverse=True)
+                logger.warning(
+                    'Pomalý požadavek %s %s (%s): %.3f s, %d SQL za %.3f s%s',
+                    method, path, endpoint, elapsed, queries, ctx_g.get('sql_time', 0.0),
+                    ''.join('\n  %.3f s  %s' % (duration, ' '.join(statement.split()))
+                            for duration, statement in statements[:SLOW_LOG_STATEMENTS]))
+
+        response.call_on_close(_finish)
+        return response
+
+    if app.config.get('METRICS_ENABLED', False):
+        token = app.config.get('METRICS_TOKEN')
+
+        def metrics():
+            if token and not hmac.compare_digest(
+                    request.headers.get('Authorization', ''), 'Bearer ' + token):
+                abort(401)
+            return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+        app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,224 @@
+"""
+Úlohy na pozadí bez externího brokeru.
+
+Dlouhé operace (export velkého rozsahu, přepočet daily_rollup) se místo
+v požadavku zařadí do tabulky job a zpracuje je malý pool vláken v procesu
+aplikace. Požadavek hned vrátí id úlohy, klient se ptá na stav
+(/api/jobs/<id>) a hotový soubor si stáhne později (/jobs/<id>/download).
+
+Stav úloh je v databázi, takže funguje napříč gunicorn workery: úlohu si
+„zabere“ atomický UPDATE (queued -> running), na počet rozběhnutých úloh
+jednoho uživatele dohlíží JOB_USER_CONCURRENCY a na počet rozpracovaných
+(čekajících i běžících) JOB_USER_QUEUE_LIMIT. Výsledné soubory leží
+v JOB_RESULT_DIR (u více workerů musí být sdílený) a po JOB_RESULT_TTL
+sekundách se mažou i se záznamem úlohy.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Job, User
+import exports
+from rollup import rebuild_rollup
+from instrumentation import JOB_DURATION
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('done', 'failed')
+
+_executor = None
+_app = None
+
+
+class JobLimitExceeded(Exception):
+    """Uživatel už má maximální počet rozpracovaných úloh."""
+
+
+def _export_csv(job, params, path):
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        for chunk in exports.iter_csv(job.user_id, params.get('project_id'),
+                                      params.get('month'), params.get('columns')):
+            output.write(chunk)
+    return 'dochazka_export.csv'
+
+
+def _export_excel(job, params, path):
+    with open(path, 'wb') as output:
+        exports.write_excel(job.user_id, params.get('project_id'),
+                            params.get('month'), params.get('columns'), output)
+    return 'dochazka_export.xlsx'
+
+
+def _rebuild_rollup(job, params, path):
+    rebuild_rollup(job.user_id)
+    return None
+
+
+# druh úlohy -> funkce(job, params, cesta výsledku) vracející název souboru ke stažení
+JOB_KINDS = {
+    'export_csv': _export_csv,
+    'export_excel': _export_excel,
+    'rebuild_rollup': _rebuild_rollup,
+}
+
+
+def init_app(app):
+    global _executor, _app
+    _app = app
+    os.makedirs(app.config['JOB_RESULT_DIR'], exist_ok=True)
+    # vlákna vznikají až s první úlohou, takže fork gunicorn workerů nevadí
+    _executor = ThreadPoolExecutor(max_workers=app.config['JOB_WORKERS'],
+                                   thread_name_prefix='job')
+
+
+def enqueue(user_id, kind, params=None):
+    """
+    Zařadí úlohu a vrátí její záznam. Vyhodí JobLimitExceeded, pokud má
+    uživatel rozpracováno JOB_USER_QUEUE_LIMIT úloh.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError('Neznámý druh úlohy: %s' % kind)
+    active = db.session.query(func.count(Job.id)).filter(
+        Job.user_id == user_id, Job.status.in_(ACTIVE_STATUSES)).scalar()
+    if active >= current_app.config['JOB_USER_QUEUE_LIMIT']:
+        raise JobLimitExceeded()
+    job = Job(id=uuid.uuid4().hex, user_id=user_id, kind=kind,
+              params=json.dumps(params or {}), status='queued')
+    db.session.add(job)
+    db.session.commit()
+    kick()
+    return job
+
+
+def kick():
+    """Probudí pool, aby zpracoval čekající úlohy (i ty po jiném workeru)."""
+    _executor.submit(_drain)
+
+
+def result_path(job):
+    return os.path.join(_app.config['JOB_RESULT_DIR'], job.id)
+
+
+def job_to_dict(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'error': job.error,
+        'download': bool(job.status == 'done' and job.result_name),
+    }
+
+
+def _drain():
+    with _app.app_context():
+        try:
+            while True:
+                job = _claim_next()
+                if job is None:
+                    return
+                _run(job)
+        except Exception:
+            logger.exception('Zpracování úloh selhalo')
+        finally:
+            db.session.remove()
+
+
+def _cleanup():
+    """
+    Úlohy „running“ déle než JOB_TIMEOUT (worker mezitím spadl) označí jako
+    selhané a smaže dokončené úlohy starší než JOB_RESULT_TTL i se soubory.
+    """
+    now = datetime.utcnow()
+    table = Job.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.status == 'running',
+               table.c.started_at < now - timedelta(seconds=_app.config['JOB_TIMEOUT']))
+        .values(status='failed', finished_at=now, error='Úloha nedoběhla (restart workeru?).')
+    )
+    expired = Job.query.filter(
+        Job.status.in_(FINISHED_STATUSES),
+        Job.finished_at < now - timedelta(seconds=_app.config['JOB_RESULT_TTL'])).all()
+    for job in expired:
+        if job.result_path and os.path.exists(job.result_path):
+            os.remove(job.result_path)
+        db.session.delete(job)
+    db.session.commit()
+
+
+def _claim_next():
+    """
+    Zabere nejstarší čekající úlohu uživatele, který nepřekročil
+    JOB_USER_CONCURRENCY běžících úloh. Vrací Job, nebo None.
+    """
+    _cleanup()
+    running = dict(db.session.query(Job.user_id, func.count(Job.id))
+                   .filter(Job.status == 'running').group_by(Job.user_id).all())
+    limit = _app.config['JOB_USER_CONCURRENCY']
+    queued = Job.query.filter(Job.status == 'queued').order_by(Job.created_at).limit(100).all()
+    table = Job.__table__
+    for job in queued:
+        if running.get(job.user_id, 0) >= limit:
+            continue
+        # Převzetí i limit v jednom UPDATE – úlohu nebo jinou úlohu téhož
+        # uživatele mohl mezitím zabrat jiný worker. Zámek řádku uživatele
+        # řadí workery za sebou i na PostgreSQL/MySQL, kde by souběžné
+        # UPDATE viděly stejný stav; SQLite zápisy řadí samo. Počet běžících
+        # je v odvozené tabulce, protože MySQL nedovolí v UPDATE číst přímo
+        # z upravované tabulky.
+        db.session.execute(
+            select(User.__table__.c.id).where(User.__table__.c.id == job.user_id)
+            .with_for_update()
+        )
+        running_now = (
+            select(func.count().label('n'))
+            .where(table.c.user_id == job.user_id, table.c.status == 'running')
+            .subquery('running_now')
+        )
+        claimed = db.session.execute(
+            table.update()
+            .where(table.c.id == job.id, table.c.status == 'queued',
+                   select(running_now.c.n).scalar_subquery() < limit)
+            .values(status='running', started_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job.id)
+    return None
+
+
+def _run(job):
+    job_id = job.id
+    kind = job.kind
+    started = time.perf_counter()
+    path = result_path(job)
+    partial = path + '.part'
+    try:
+        result_name = JOB_KINDS[job.kind](job, json.loads(job.params), partial)
+        if result_name:
+            os.replace(partial, path)
+        job.status = 'done'
+        job.result_name = result_name
+        job.result_path = path if result_name else None
+    except Exception as exc:
+        logger.exception('Úloha %s (%s) selhala', job_id, job.kind)
+        db.session.rollback()
+        if os.path.exists(partial):
+            os.remove(partial)
+        job = db.session.get(Job, job_id)
+        job.status = 'failed'
+        job.error = str(exc)[:1000] or exc.__class__.__name__
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    JOB_DURATION.observe(time.perf_counter() - started, kind=kind, status=job.status)
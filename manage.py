@@ -1,10 +1,24 @@
-from flask_script import Manager
-from app import app, db
+"""
+Správa aplikace z příkazové řádky (náhrada za zaniklý flask_script):
+
+    python manage.py db upgrade
+    python manage.py init-db
+    python manage.py archive-logs
+    python manage.py run
+
+Je to totéž jako `flask --app app ...` – stejné příkazy z blueprintu
+i Flask-Migrate, jen bez nutnosti nastavovat --app / FLASK_APP.
+"""
+import click
+from flask.cli import FlaskGroup
+
+from app import create_app
+
+
+@click.group(cls=FlaskGroup, create_app=create_app)
+def cli():
+    """Správa aplikace Docházka."""
 
-manager = Manager(app)
-# Přidáme příkazy pro migraci
-from flask_migrate import MigrateCommand
-manager.add_command('db', MigrateCommand)
 
 if __name__ == '__main__':
-    manager.run()
+    cli()
@@ -0,0 +1,26 @@
+"""Složené indexy log_entry pro dotazy podle časového rozsahu
+
+Revision ID: 0002_log_entry_range_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_log_entry_range_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_log_entry_user_start', 'log_entry', ['user_id', 'start_time'])
+    op.create_index('ix_log_entry_user_end', 'log_entry', ['user_id', 'end_time'])
+
+
+def downgrade():
+    op.drop_index('ix_log_entry_user_end', table_name='log_entry')
+    op.drop_index('ix_log_entry_user_start', table_name='log_entry')
@@ -0,0 +1,64 @@
+"""Tabulka daily_rollup s denními součty pro reporty
+
+Revision ID: 0003_daily_rollup
+Revises: 0002_log_entry_range_indexes
+Create Date: 2026-10-18 09:30:00
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_daily_rollup'
+down_revision = '0002_log_entry_range_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rollup = op.create_table(
+        'daily_rollup',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('minutes', sa.Float(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'project_id', 'day')
+    )
+
+    # Naplnění z existujících záznamů (stejný výpočet jako models.worked_minutes)
+    log_entry = sa.table(
+        'log_entry',
+        sa.column('user_id', sa.Integer), sa.column('project_id', sa.Integer),
+        sa.column('start_time', sa.DateTime), sa.column('end_time', sa.DateTime),
+        sa.column('pause_start', sa.DateTime), sa.column('pause_end', sa.DateTime)
+    )
+    totals = defaultdict(lambda: [0.0, 0])
+    rows = op.get_bind().execute(
+        sa.select(log_entry).where(log_entry.c.start_time.isnot(None))
+        .execution_options(yield_per=5000)
+    )
+    for user_id, project_id, start, end, pause_start, pause_end in rows:
+        minutes = 0.0
+        if start and end:
+            minutes = (end - start).total_seconds() / 60.0
+            if pause_start and pause_end:
+                minutes -= (pause_end - pause_start).total_seconds() / 60.0
+        total = totals[(user_id, project_id, start.date())]
+        total[0] += minutes
+        total[1] += 1
+    if totals:
+        op.bulk_insert(rollup, [
+            {'user_id': user_id, 'project_id': project_id, 'day': day,
+             'minutes': minutes, 'entry_count': count}
+            for (user_id, project_id, day), (minutes, count) in totals.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('daily_rollup')
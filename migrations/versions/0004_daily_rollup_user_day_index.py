@@ -0,0 +1,24 @@
+"""Index daily_rollup (user_id, day) pro filtrované reporty
+
+Revision ID: 0004_daily_rollup_user_day_index
+Revises: 0003_daily_rollup
+Create Date: 2026-10-18 09:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_daily_rollup_user_day_index'
+down_revision = '0003_daily_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_daily_rollup_user_day', 'daily_rollup', ['user_id', 'day'])
+
+
+def downgrade():
+    op.drop_index('ix_daily_rollup_user_day', table_name='daily_rollup')
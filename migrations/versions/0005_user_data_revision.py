@@ -0,0 +1,28 @@
+"""Revize dat uživatele pro ETag a cache reportů
+
+Revision ID: 0005_user_data_revision
+Revises: 0004_daily_rollup_user_day_index
+Create Date: 2026-10-18 10:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_user_data_revision'
+down_revision = '0004_daily_rollup_user_day_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('data_revision', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('data_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_updated_at')
+        batch_op.drop_column('data_revision')
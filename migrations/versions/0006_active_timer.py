@@ -0,0 +1,41 @@
+"""Tabulka active_timer s běžícími činnostmi
+
+Revision ID: 0006_active_timer
+Revises: 0005_user_data_revision
+Create Date: 2026-10-18 10:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_active_timer'
+down_revision = '0005_user_data_revision'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'active_timer',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('log_entry_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['log_entry_id'], ['log_entry.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['project_id'], ['projects.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'project_id'),
+        sa.UniqueConstraint('log_entry_id')
+    )
+    # Běžící záznamy (bez konce); při duplicitách z dřívějších souběžných
+    # kliknutí vyhrává nejnovější
+    op.execute(
+        "INSERT INTO active_timer (user_id, project_id, log_entry_id) "
+        "SELECT user_id, project_id, MAX(id) FROM log_entry "
+        "WHERE end_time IS NULL GROUP BY user_id, project_id"
+    )
+
+
+def downgrade():
+    op.drop_table('active_timer')
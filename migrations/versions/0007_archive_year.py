@@ -0,0 +1,31 @@
+"""Tabulka archive_year s archivovanými roky log_entry
+
+Revision ID: 0007_archive_year
+Revises: 0006_active_timer
+Create Date: 2026-10-18 11:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_archive_year'
+down_revision = '0006_active_timer'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Samotné tabulky log_entry_archive_<rok> vytváří až `flask archive-logs`
+    op.create_table(
+        'archive_year',
+        sa.Column('year', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('year')
+    )
+
+
+def downgrade():
+    # Archivní tabulky zůstávají; bez archive_year je aplikace nečte
+    op.drop_table('archive_year')
@@ -0,0 +1,72 @@
+"""Uložená délka práce log_entry.worked_minutes
+
+Revision ID: 0008_log_entry_worked_minutes
+Revises: 0007_archive_year
+Create Date: 2026-10-18 11:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_log_entry_worked_minutes'
+down_revision = '0007_archive_year'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _backfill(table_name):
+    # Stejný výpočet jako models.worked_minutes
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer), sa.column('worked_minutes', sa.Float),
+        sa.column('start_time', sa.DateTime), sa.column('end_time', sa.DateTime),
+        sa.column('pause_start', sa.DateTime), sa.column('pause_end', sa.DateTime)
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.start_time, table.c.end_time,
+                      table.c.pause_start, table.c.pause_end)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for entry_id, start, end, pause_start, pause_end in rows:
+            minutes = 0.0
+            if start and end:
+                minutes = (end - start).total_seconds() / 60.0
+                if pause_start and pause_end:
+                    minutes -= (pause_end - pause_start).total_seconds() / 60.0
+            updates.append({'entry_id': entry_id, 'minutes': minutes})
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam('entry_id'))
+            .values(worked_minutes=sa.bindparam('minutes')),
+            updates
+        )
+        last_id = rows[-1][0]
+
+
+def _archive_tables():
+    years = op.get_bind().execute(sa.text('SELECT year FROM archive_year')).scalars()
+    return ['log_entry_archive_%d' % year for year in years]
+
+
+def upgrade():
+    for table_name in ['log_entry'] + _archive_tables():
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column('worked_minutes', sa.Float(), nullable=False,
+                                          server_default='0'))
+        _backfill(table_name)
+
+
+def downgrade():
+    for table_name in ['log_entry'] + _archive_tables():
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('worked_minutes')
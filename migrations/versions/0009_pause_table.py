@@ -0,0 +1,96 @@
+"""Tabulka pause (více pauz na záznam) a součet log_entry.paused_minutes
+
+Revision ID: 0009_pause_table
+Revises: 0008_log_entry_worked_minutes
+Create Date: 2026-10-18 12:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_pause_table'
+down_revision = '0008_log_entry_worked_minutes'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _archive_tables():
+    years = op.get_bind().execute(sa.text('SELECT year FROM archive_year')).scalars()
+    return ['log_entry_archive_%d' % year for year in years]
+
+
+def _backfill_paused_minutes(table_name):
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer), sa.column('paused_minutes', sa.Float),
+        sa.column('pause_start', sa.DateTime), sa.column('pause_end', sa.DateTime)
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.pause_start, table.c.pause_end)
+            .where(table.c.id > last_id, table.c.pause_start.isnot(None),
+                   table.c.pause_end.isnot(None))
+            .order_by(table.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam('entry_id'))
+            .values(paused_minutes=sa.bindparam('minutes')),
+            [{'entry_id': entry_id, 'minutes': (end - start).total_seconds() / 60.0}
+             for entry_id, start, end in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    op.create_table(
+        'pause',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('log_entry_id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['log_entry_id'], ['log_entry.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_pause_log_entry_id', 'pause', ['log_entry_id'])
+    # Dosavadní jediná pauza záznamu se stane prvním řádkem v pause
+    op.execute(
+        "INSERT INTO pause (log_entry_id, start_time, end_time) "
+        "SELECT id, pause_start, pause_end FROM log_entry WHERE pause_start IS NOT NULL"
+    )
+
+    # worked_minutes se nemění – počítal se ze stejné pauzy
+    for table_name in ['log_entry'] + _archive_tables():
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column('paused_minutes', sa.Float(), nullable=False,
+                                          server_default='0'))
+        _backfill_paused_minutes(table_name)
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('pause_start')
+            batch_op.drop_column('pause_end')
+
+
+def downgrade():
+    for table_name in ['log_entry'] + _archive_tables():
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column('pause_start', sa.DateTime(), nullable=True))
+            batch_op.add_column(sa.Column('pause_end', sa.DateTime(), nullable=True))
+    # Zpět se vejde jen první pauza záznamu; worked_minutes dál odpovídá všem
+    op.execute(
+        "UPDATE log_entry SET "
+        "pause_start = (SELECT MIN(p.start_time) FROM pause p WHERE p.log_entry_id = log_entry.id), "
+        "pause_end = (SELECT p.end_time FROM pause p WHERE p.log_entry_id = log_entry.id "
+        "ORDER BY p.start_time LIMIT 1)"
+    )
+    for table_name in ['log_entry'] + _archive_tables():
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('paused_minutes')
+    op.drop_index('ix_pause_log_entry_id', table_name='pause')
+    op.drop_table('pause')
@@ -0,0 +1,43 @@
+"""Tabulka job s úlohami na pozadí
+
+Revision ID: 0010_job
+Revises: 0009_pause_table
+Create Date: 2026-10-18 13:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_job'
+down_revision = '0009_pause_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('result_path', sa.String(length=255), nullable=True),
+        sa.Column('result_name', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_user_status', 'job', ['user_id', 'status'])
+    op.create_index('ix_job_status_created', 'job', ['status', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_job_status_created', table_name='job')
+    op.drop_index('ix_job_user_status', table_name='job')
+    op.drop_table('job')
@@ -0,0 +1,55 @@
+"""Týmy, členství, sdílené projekty a indexy pro týmový report
+
+Revision ID: 0011_teams
+Revises: 0010_job
+Create Date: 2026-10-18 15:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_teams'
+down_revision = '0010_job'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'teams',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'team_membership',
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=16), nullable=False),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('team_id', 'user_id')
+    )
+    op.create_index('ix_team_membership_user', 'team_membership', ['user_id'])
+
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.add_column(sa.Column('team_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_projects_team_id', 'teams', ['team_id'], ['id'])
+        batch_op.create_index('ix_projects_team', ['team_id'])
+
+    # týmový report: projekty týmu a rozsah dní napříč uživateli
+    op.create_index('ix_daily_rollup_project_day', 'daily_rollup', ['project_id', 'day'])
+
+
+def downgrade():
+    op.drop_index('ix_daily_rollup_project_day', table_name='daily_rollup')
+    with op.batch_alter_table('projects') as batch_op:
+        batch_op.drop_index('ix_projects_team')
+        batch_op.drop_constraint('fk_projects_team_id', type_='foreignkey')
+        batch_op.drop_column('team_id')
+    op.drop_index('ix_team_membership_user', table_name='team_membership')
+    op.drop_table('team_membership')
+    op.drop_table('teams')
@@ -0,0 +1,62 @@
+"""Běžící záznamy mají worked_minutes 0
+
+Revision ID: 0012_running_entry_worked_minutes
+Revises: 0011_teams
+Create Date: 2026-10-18 18:20:00
+
+"""
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_running_entry_worked_minutes'
+down_revision = '0011_teams'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Běžící záznam s dokončenou pauzou měl záporné worked_minutes (0 - pauza)
+    # a ty se propsaly i do daily_rollup. Archiv obsahuje jen uzavřené záznamy.
+    log_entry = sa.table(
+        'log_entry',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+        sa.column('project_id', sa.Integer), sa.column('start_time', sa.DateTime),
+        sa.column('end_time', sa.DateTime), sa.column('worked_minutes', sa.Float)
+    )
+    rollup = sa.table(
+        'daily_rollup',
+        sa.column('user_id', sa.Integer), sa.column('project_id', sa.Integer),
+        sa.column('day', sa.Date), sa.column('minutes', sa.Float)
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(log_entry.c.id, log_entry.c.user_id, log_entry.c.project_id,
+                  log_entry.c.start_time, log_entry.c.worked_minutes)
+        .where(log_entry.c.end_time.is_(None), log_entry.c.worked_minutes != 0)
+    ).all()
+    if not rows:
+        return
+    deltas = defaultdict(float)
+    for _, user_id, project_id, start, minutes in rows:
+        if start:
+            deltas[(user_id, project_id, start.date())] += minutes
+    bind.execute(
+        log_entry.update().where(log_entry.c.id.in_([row[0] for row in rows]))
+        .values(worked_minutes=0.0)
+    )
+    for (user_id, project_id, day), minutes in deltas.items():
+        bind.execute(
+            rollup.update()
+            .where(rollup.c.user_id == user_id, rollup.c.project_id == project_id,
+                   rollup.c.day == day)
+            .values(minutes=rollup.c.minutes - minutes)
+        )
+
+
+def downgrade():
+    # opravená data se nevracejí
+    pass
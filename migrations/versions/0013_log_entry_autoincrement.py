@@ -0,0 +1,47 @@
+"""log_entry s AUTOINCREMENT na SQLite
+
+Revision ID: 0013_log_entry_autoincrement
+Revises: 0012_running_entry_worked_minutes
+Create Date: 2026-10-18 19:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_log_entry_autoincrement'
+down_revision = '0012_running_entry_worked_minutes'
+branch_labels = None
+depends_on = None
+
+
+def _archive_tables():
+    years = op.get_bind().execute(sa.text('SELECT year FROM archive_year')).scalars()
+    return ['log_entry_archive_%d' % year for year in years]
+
+
+def upgrade():
+    # Bez AUTOINCREMENT SQLite přiděluje max(id) + 1, takže po archivaci
+    # záznamů s nejvyššími id by je dostaly nové záznamy. MySQL a PostgreSQL
+    # id neopakují.
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('log_entry', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}):
+        pass
+    # čítač začne za nejvyšším id v log_entry i ve všech archivech
+    last_id = max([bind.execute(sa.text('SELECT COALESCE(MAX(id), 0) FROM %s' % name)).scalar()
+                   for name in ['log_entry'] + _archive_tables()])
+    bind.execute(sa.text("DELETE FROM sqlite_sequence WHERE name = 'log_entry'"))
+    bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('log_entry', :seq)"),
+                 {'seq': last_id})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('log_entry', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}):
+        pass
@@ -1,34 +1,251 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from datetime import datetime
 
 db = SQLAlchemy()
 
+
+def interval_minutes(start_time, end_time):
+    """Délka intervalu v minutách; nedokončený interval má 0."""
+    if start_time and end_time:
+        return (end_time - start_time).total_seconds() / 60.0
+    return 0.0
+
+
+def worked_minutes(start_time, end_time, paused_minutes=0.0):
+    """
+    Odpracované minuty záznamu: (konec - začátek) - součet pauz.
+    Výsledek se ukládá do sloupce LogEntry.worked_minutes. Běžící záznam
+    (bez konce) má 0, i když už má dokončené pauzy – do součtů se
+    započítá až po ukončení.
+    """
+    if not (start_time and end_time):
+        return 0.0
+    return interval_minutes(start_time, end_time) - (paused_minutes or 0.0)
+
+def pauses_error(start_time, end_time, pauses):
+    """
+    Zkontroluje pauzy záznamu [(začátek, konec | None), ...]: každá musí
+    ležet uvnitř záznamu (u běžícího záznamu jen po jeho začátku), pauza
+    uzavřeného záznamu musí mít konec a žádné dvě se nesmí překrývat.
+    Vrací chybovou zprávu pro uživatele, nebo None.
+    """
+    for pause_start, pause_end in pauses:
+        if end_time and not pause_end:
+            return 'Start pauzy bez konce pauzy.'
+        if pause_end and pause_end < pause_start:
+            return 'Konec pauzy je před jejím začátkem.'
+        if (start_time and pause_start < start_time) or \
+                (end_time and (pause_end or pause_start) > end_time):
+            return 'Pauza leží mimo záznam.'
+    ordered = sorted(pauses, key=lambda pause: pause[0])
+    for (_, previous_end), (next_start, _) in zip(ordered, ordered[1:]):
+        # neukončená pauza zabírá vše po svém začátku
+        if previous_end is None or next_start < previous_end:
+            return 'Pauzy se překrývají.'
+    return None
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'  # Explicitní název tabulky
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
+    # Revize dat (záznamy, projekty) pro ETag a cache reportů – viz revisions.py
+    data_revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    data_updated_at = db.Column(db.DateTime, nullable=True)
     # Vztah na projekty, které tento uživatel vlastní
     projects = db.relationship('Project', backref='owner', lazy=True)
 
 class Project(db.Model):
     __tablename__ = 'projects'  # Explicitní název tabulky
+    # projekty týmu se hledají při každém výpisu dostupných projektů a v týmovém reportu
+    __table_args__ = (
+        db.Index('ix_projects_team', 'team_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     # Přidáme sloupec user_id, který odkazuje na vlastníka projektu (User)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Sdílený projekt týmu – vykazovat na něj mohou všichni členové (viz teams.py)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=True)
+
+    team = db.relationship('Team', backref=db.backref('projects', lazy=True))
+
+
+class Team(db.Model):
+    """
+    Tým uživatelů. Sdílí projekty (Project.team_id) a manažeři týmu vidí
+    týmový report přes všechny členy.
+    """
+    __tablename__ = 'teams'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    memberships = db.relationship('TeamMembership', backref='team', lazy=True,
+                                  cascade='all, delete-orphan')
+
+
+class TeamMembership(db.Model):
+    """
+    Členství uživatele v týmu. Role 'manager' smí spravovat členy a vidí
+    týmový report, 'member' jen vykazuje na sdílené projekty.
+    """
+    __tablename__ = 'team_membership'
+    # týmy uživatele se hledají při každém výpisu dostupných projektů
+    __table_args__ = (
+        db.Index('ix_team_membership_user', 'user_id'),
+    )
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    role = db.Column(db.String(16), nullable=False, default='member')
+
+    user = db.relationship('User')
 
 class LogEntry(db.Model):
     __tablename__ = 'log_entry'
+    # Všechna čtení filtrují podle uživatele a časového rozsahu (kalendář, reporty, exporty)
+    # AUTOINCREMENT na SQLite: id archivovaných záznamů (archive.py) se nesmí
+    # znovu přidělit, jinak by se v kalendáři i archivu potkaly dva záznamy
+    __table_args__ = (
+        db.Index('ix_log_entry_user_start', 'user_id', 'start_time'),
+        db.Index('ix_log_entry_user_end', 'user_id', 'end_time'),
+        {'sqlite_autoincrement': True},
+    )
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime, nullable=True)
-    pause_start = db.Column(db.DateTime, nullable=True)
-    pause_end = db.Column(db.DateTime, nullable=True)
     note = db.Column(db.Text, nullable=True)
+    # Součet dokončených pauz (tabulka pause) – udržují ho metody níže
+    paused_minutes = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    # Uložená délka práce – výpis, exporty i reporty jen čtou/sčítají tento sloupec.
+    # Přepočítává ji validátor níže při každé změně časů nebo pauz.
+    worked_minutes = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
 
     project = db.relationship('Project', backref=db.backref('logs', lazy=True))
     user = db.relationship('User', backref=db.backref('logs', lazy=True))
+    pauses = db.relationship('Pause', backref='log_entry', order_by='Pause.start_time',
+                             cascade='all, delete-orphan')
+
+    @validates('start_time', 'end_time', 'paused_minutes')
+    def _recompute_worked_minutes(self, key, value):
+        values = {name: getattr(self, name)
+                  for name in ('start_time', 'end_time', 'paused_minutes')}
+        values[key] = value
+        self.worked_minutes = worked_minutes(**values)
+        return value
+
+    @property
+    def open_pause(self):
+        """Právě probíhající pauza (bez konce), nebo None."""
+        return next((pause for pause in self.pauses if pause.end_time is None), None)
+
+    def start_pause(self, start_time):
+        self.pauses.append(Pause(start_time=start_time))
+
+    def end_pause(self, end_time):
+        self.open_pause.end_time = end_time
+        self.update_paused_minutes()
+
+    def set_pauses(self, intervals):
+        """Nahradí pauzy záznamu seznamem dvojic (start, konec)."""
+        self.pauses = [Pause(start_time=start, end_time=end) for start, end in intervals]
+        self.update_paused_minutes()
+
+    def pauses_error(self):
+        """Chyba v pauzách záznamu po změně (viz pauses_error), nebo None."""
+        return pauses_error(self.start_time, self.end_time,
+                            [(pause.start_time, pause.end_time) for pause in self.pauses])
+
+    def update_paused_minutes(self):
+        self.paused_minutes = sum(pause.minutes for pause in self.pauses)
+
+
+class Pause(db.Model):
+    """
+    Jedna pauza záznamu. Záznam jich může mít libovolně mnoho; pro výpočty
+    se čte jen jejich součet LogEntry.paused_minutes.
+    """
+    __tablename__ = 'pause'
+    id = db.Column(db.Integer, primary_key=True)
+    log_entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id', ondelete='CASCADE'),
+                             nullable=False, index=True)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def minutes(self):
+        return interval_minutes(self.start_time, self.end_time)
+
+
+class ActiveTimer(db.Model):
+    """
+    Právě běžící činnost (záznam bez konce). Primární klíč (user_id, project_id)
+    zaručuje na úrovni databáze nejvýše jednu běžící činnost na uživatele
+    a projekt, takže souběžná kliknutí na Start nevytvoří duplicitní záznam.
+    """
+    __tablename__ = 'active_timer'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    log_entry_id = db.Column(db.Integer, db.ForeignKey('log_entry.id', ondelete='CASCADE'),
+                             nullable=False, unique=True)
+
+    log_entry = db.relationship('LogEntry', backref=db.backref(
+        'active_timer', uselist=False, cascade='all, delete-orphan'))
+
+class DailyRollup(db.Model):
+    """
+    Předpočítaný součet odpracovaných minut za uživatele, projekt a den
+    (den = datum začátku záznamu). Udržuje se průběžně v rollup.py.
+    """
+    __tablename__ = 'daily_rollup'
+    # reporty filtrují uživatele a rozsah dní napříč projekty,
+    # týmový report projekty týmu a rozsah dní napříč uživateli
+    __table_args__ = (
+        db.Index('ix_daily_rollup_user_day', 'user_id', 'day'),
+        db.Index('ix_daily_rollup_project_day', 'project_id', 'day'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    minutes = db.Column(db.Float, nullable=False, default=0.0)
+    # počet záznamů v daném dni – řádky s nulou se do reportů nepočítají
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ArchiveYear(db.Model):
+    """
+    Rok, jehož uzavřené záznamy už leží v tabulce log_entry_archive_<rok>
+    (viz archive.py).
+    """
+    __tablename__ = 'archive_year'
+    year = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class Job(db.Model):
+    """
+    Úloha na pozadí (export, přepočet součtů) – viz jobs.py. Stav je
+    v databázi, takže ho vidí všechny workery a přežije restart.
+    """
+    __tablename__ = 'job'
+    # běžící/čekající úlohy uživatele se hledají při každém zařazení
+    __table_args__ = (
+        db.Index('ix_job_user_status', 'user_id', 'status'),
+        db.Index('ix_job_status_created', 'status', 'created_at'),
+    )
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    kind = db.Column(db.String(32), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')
+    # queued -> running -> done | failed
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    result_path = db.Column(db.String(255), nullable=True)
+    result_name = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
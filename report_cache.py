@@ -0,0 +1,107 @@
+"""
+Cache výsledků reportů po uživatelích.
+
+Klíč je (uživatel, revize dat uživatele, období, projekt, od, do). Revize
+(users.data_revision, viz revisions.py) se zvyšuje v každé transakci, která
+změnila záznamy nebo projekty uživatele, takže staré výsledky se nikdy
+nevrátí – jen postupně vypadnou z LRU. Revize žije v databázi, proto
+invalidace funguje i s lokální cache v každém workeru zvlášť.
+
+Výchozí backend drží data v paměti procesu. Pro sdílení mezi gunicorn
+workery lze nastavit REPORT_CACHE_URL=redis://... (jakýkoli server
+kompatibilní s Redisem; omezení velikosti a LRU pak řeší jeho
+maxmemory/maxmemory-policy allkeys-lru, záznamy mají navíc TTL).
+"""
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 24 * 3600
+
+
+class LocalBackend:
+    """
+    LRU cache v paměti procesu s pevným maximálním počtem položek.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    Backend nad serverem kompatibilním s Redisem – sdílený mezi procesy.
+    """
+
+    def __init__(self, url, ttl=DEFAULT_TTL, prefix='dochazka:report:'):
+        import redis  # volitelná závislost, jen pokud je backend nastaven
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value):
+        self._redis.set(self.prefix + key, value, ex=self.ttl)
+
+    def clear(self):
+        for key in self._redis.scan_iter(self.prefix + '*'):
+            self._redis.delete(key)
+
+
+_backend = LocalBackend()
+
+
+def init_app(app):
+    """
+    Vybere backend podle konfigurace (REPORT_CACHE_URL, REPORT_CACHE_SIZE,
+    REPORT_CACHE_TTL).
+    """
+    global _backend
+    url = app.config.get('REPORT_CACHE_URL')
+    if url:
+        _backend = RedisBackend(url, ttl=app.config.get('REPORT_CACHE_TTL', DEFAULT_TTL))
+    else:
+        _backend = LocalBackend(app.config.get('REPORT_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+    app.extensions['report_cache'] = _backend
+
+
+def get_backend():
+    return _backend
+
+
+def cached_report(user_id, revision, params, compute):
+    """
+    Vrátí výsledek reportu z cache, nebo ho spočítá funkcí `compute`
+    a uloží. Výsledek musí jít serializovat do JSON.
+    """
+    key = json.dumps([user_id, revision] + list(params))
+    value = _backend.get(key)
+    if value is not None:
+        return json.loads(value)
+    result = compute()
+    _backend.set(key, json.dumps(result))
+    return result
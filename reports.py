@@ -0,0 +1,65 @@
+"""
+Agregace reportů z daily_rollup.
+
+Výsledek je sloupcový: pole období (labels), seznam projektů a pro každý
+projekt pole hodin ve stejném pořadí jako labels. V tomto tvaru ho vrací
+/api/reports a stránka /reports z něj kreslí graf i tabulku.
+"""
+from datetime import date
+
+from sqlalchemy import func
+
+from models import db, Project, DailyRollup
+from sql_funcs import period_label, PERIODS
+
+# hodiny na 4 desetinná místa (setiny minuty) – kratší JSON
+HOURS_PRECISION = 4
+
+
+def build_report(user_id, period, project_id, start_date, end_date):
+    """
+    Hodiny uživatele po obdobích a projektech. `project_id` je 'all' nebo id,
+    `start_date`/`end_date` ISO data (obě včetně) nebo None.
+    """
+    # Filters are pushed into the aggregate query below (range scan on user_id, day)
+    filters = [DailyRollup.user_id == user_id, DailyRollup.entry_count > 0]
+    if project_id != 'all':
+        filters.append(DailyRollup.project_id == int(project_id))
+    if start_date:
+        filters.append(DailyRollup.day >= date.fromisoformat(start_date))
+    if end_date:
+        # “Do” is inclusive
+        filters.append(DailyRollup.day <= date.fromisoformat(end_date))
+
+    # Aggregate the precomputed daily rollup instead of raw log entries;
+    # period labels are compiled per database dialect (sql_funcs.period_label)
+    if period not in PERIODS:
+        period = 'monthly'
+    grouping = period_label(period, DailyRollup.day)
+
+    raw_data = (
+      db.session.query(
+        grouping.label('period'),
+        Project.name.label('project_name'),
+        (func.sum(DailyRollup.minutes) / 60.0).label('total_hours')
+      )
+      .join(Project, Project.id == DailyRollup.project_id)
+      .filter(*filters)
+      .group_by(grouping, Project.name)
+      .all()
+    )
+
+    # Pivot do sloupců: jedno pole hodin na projekt, zarovnané s labels
+    pivot = {}
+    proj_names = set()
+    for per, name, hrs in raw_data:
+        pivot.setdefault(str(per), {})[name] = round(float(hrs or 0), HOURS_PRECISION)
+        proj_names.add(name)
+    labels = sorted(pivot.keys())
+    projects = sorted(proj_names)
+    return {
+        "period": period,
+        "labels": labels,
+        "projects": projects,
+        "values": [[pivot[l].get(name, 0) for l in labels] for name in projects],
+    }
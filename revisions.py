@@ -0,0 +1,105 @@
+"""
+Revize dat uživatele pro podmíněné GET (ETag / Last-Modified) a cache reportů.
+
+users.data_revision se zvyšuje (a users.data_updated_at nastavuje) ve stejné
+transakci, která mění záznamy nebo projekty uživatele (u sdíleného projektu
+všech členů týmu, u změny členství toho člena). Odpověď na GET lze
+tedy ověřit jedním dotazem na primární klíč, bez načítání samotných řádků.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from flask import request, make_response
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from models import db, User, LogEntry, Project, Pause, TeamMembership
+
+
+def mark_user_changed(session, user_id):
+    """
+    Zvýší revizi dat uživatele v aktuální transakci. ORM změny LogEntry,
+    Pause a Project se hlásí samy; volat jen pro zápisy mimo ORM flush
+    (hromadné INSERTy, bulk UPDATE/DELETE).
+    """
+    session.connection().execute(
+        update(User.__table__)
+        .where(User.__table__.c.id == user_id)
+        .values(data_revision=User.__table__.c.data_revision + 1,
+                data_updated_at=datetime.utcnow())
+    )
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_changed_users(session, flush_context, instances):
+    user_ids = set()
+    team_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (LogEntry, Project)) and obj.user_id is not None:
+            user_ids.add(obj.user_id)
+            if isinstance(obj, Project) and obj.team_id is not None:
+                team_ids.add(obj.team_id)
+        elif isinstance(obj, Pause) and obj.log_entry is not None:
+            user_ids.add(obj.log_entry.user_id)
+        elif isinstance(obj, TeamMembership):
+            # člen získal nebo ztratil sdílené projekty týmu
+            user_ids.add(obj.user_id)
+    if team_ids:
+        # sdílený projekt vidí v nabídkách všichni členové týmu
+        user_ids.update(session.execute(
+            select(TeamMembership.user_id).where(TeamMembership.team_id.in_(team_ids))
+        ).scalars())
+    for user_id in user_ids:
+        mark_user_changed(session, user_id)
+
+
+def get_revision(user_id):
+    """
+    Vrátí (revize, čas poslední změny) dat uživatele.
+    """
+    table = User.__table__
+    row = db.session.execute(
+        select(table.c.data_revision, table.c.data_updated_at).where(table.c.id == user_id)
+    ).first()
+    return (row[0] or 0, row[1]) if row else (0, None)
+
+
+def make_etag(user_id, revision, *parts):
+    raw = '%d:%d:%s' % (user_id, revision, ':'.join(str(p) for p in parts))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _last_modified(updated_at):
+    # ukládáme naive UTC, HTTP hlavička má přesnost na sekundy
+    if updated_at is None:
+        return None
+    return updated_at.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def not_modified(etag, updated_at):
+    """
+    Pokud klient už má aktuální verzi (If-None-Match / If-Modified-Since),
+    vrátí odpověď 304, jinak None.
+    """
+    last_modified = _last_modified(updated_at)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    response = make_response('', 304)
+    return add_validators(response, etag, updated_at)
+
+
+def add_validators(response, etag, updated_at):
+    response.set_etag(etag)
+    last_modified = _last_modified(updated_at)
+    if last_modified:
+        response.last_modified = last_modified
+    # prohlížeč smí odpověď uložit, ale před použitím ji musí ověřit
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,159 @@
+"""
+Průběžná údržba tabulky daily_rollup.
+
+Každá změna LogEntry (vytvoření, úprava, smazání) – ať z formulářů v app.py,
+nebo z JSON API v calendar_bp – prochází flushem ORM session. Listener před
+flushem spočítá rozdíl příspěvku záznamu do denních součtů a promítne ho do
+daily_rollup ve stejné transakci. Reporty pak sčítají malou tabulku součtů
+místo celé historie log_entry.
+"""
+from collections import defaultdict
+
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+
+from models import db, LogEntry, DailyRollup
+from archive import entries_source
+
+
+def entry_contribution(user_id, project_id, start_time, minutes):
+    """
+    Vrátí (klíč rollupu, minuty) pro jeden záznam, nebo None, pokud záznam
+    nemá začátek (nelze ho přiřadit ke dni).
+    """
+    if not start_time:
+        return None
+    return (user_id, project_id, start_time.date()), minutes or 0.0
+
+
+def _stored_contribution(session, entry_id):
+    # Řádek v DB má před flushem ještě původní hodnoty
+    table = LogEntry.__table__
+    row = session.connection().execute(
+        select(table.c.user_id, table.c.project_id, table.c.start_time,
+               table.c.worked_minutes)
+        .where(table.c.id == entry_id)
+    ).first()
+    return entry_contribution(*row) if row else None
+
+
+def _current_contribution(entry):
+    return entry_contribution(entry.user_id, entry.project_id, entry.start_time,
+                              entry.worked_minutes)
+
+
+# kolik klíčů jde do jednoho INSERT … ON CONFLICT (5 parametrů na klíč)
+UPSERT_CHUNK = 500
+UPSERT_DIALECTS = ('sqlite', 'postgresql', 'mysql', 'mariadb')
+
+
+def _upsert(dialect, table, rows):
+    """
+    INSERT, který u existujícího klíče přičte minuty a počet k uloženým
+    hodnotám (dialekty z UPSERT_DIALECTS).
+    """
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.project_id, table.c.day],
+            set_={'minutes': table.c.minutes + stmt.excluded.minutes,
+                  'entry_count': table.c.entry_count + stmt.excluded.entry_count})
+    from sqlalchemy.dialects.mysql import insert
+    stmt = insert(table).values(rows)
+    return stmt.on_duplicate_key_update(
+        minutes=table.c.minutes + stmt.inserted.minutes,
+        entry_count=table.c.entry_count + stmt.inserted.entry_count)
+
+
+def apply_deltas(session, deltas):
+    """
+    Přičte změny {(user_id, project_id, day): (minuty, počet)} do daily_rollup.
+    Jde o upsert s minutes = minutes + delta: souběžné transakce nepřepíšou
+    své změny a ani první zápis nového dne nespadne na IntegrityError, když
+    stejný klíč mezitím vložil jiný požadavek.
+    """
+    # pevné pořadí klíčů – souběžné transakce zamykají řádky ve stejném pořadí
+    rows = [{'user_id': user_id, 'project_id': project_id, 'day': day,
+             'minutes': minutes, 'entry_count': count}
+            for (user_id, project_id, day), (minutes, count) in sorted(deltas.items())
+            if minutes or count]
+    if not rows:
+        return
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect not in UPSERT_DIALECTS:
+        _apply_deltas_orm(session, rows)
+        return
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        connection.execute(_upsert(dialect, DailyRollup.__table__,
+                                   rows[start:start + UPSERT_CHUNK]))
+
+
+def _apply_deltas_orm(session, rows):
+    # jiné databáze: SELECT a přičtení výrazem; souběžné vložení nového klíče
+    # zde skončí na IntegrityError
+    with session.no_autoflush:
+        for row in rows:
+            existing = session.get(DailyRollup, (row['user_id'], row['project_id'], row['day']))
+            if existing is None:
+                session.add(DailyRollup(**row))
+            else:
+                existing.minutes = DailyRollup.minutes + row['minutes']
+                existing.entry_count = DailyRollup.entry_count + row['entry_count']
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_log_entry_changes(session, flush_context, instances):
+    deltas = defaultdict(lambda: [0.0, 0])
+
+    def add(contribution, sign):
+        if contribution:
+            key, minutes = contribution
+            deltas[key][0] += sign * minutes
+            deltas[key][1] += sign
+
+    for obj in session.new:
+        if isinstance(obj, LogEntry):
+            add(_current_contribution(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, LogEntry) and session.is_modified(obj):
+            add(_stored_contribution(session, obj.id), -1)
+            add(_current_contribution(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, LogEntry):
+            add(_stored_contribution(session, obj.id), -1)
+
+    if deltas:
+        apply_deltas(session, {key: tuple(value) for key, value in deltas.items()})
+
+
+def rebuild_rollup(user_id=None):
+    """
+    Přepočítá daily_rollup od nuly z log_entry a archivů (pro všechny uživatele,
+    nebo jen pro zadaného). Vrací počet vytvořených řádků.
+    """
+    # včetně ročních archivů – daily_rollup pokrývá celou historii
+    entries = entries_source(user_id)
+    delete = DailyRollup.__table__.delete()
+    source = (
+        select(entries.c.user_id, entries.c.project_id,
+               func.date(entries.c.start_time),
+               func.sum(entries.c.worked_minutes),
+               func.count(entries.c.id))
+        .where(entries.c.start_time.isnot(None))
+        .group_by(entries.c.user_id, entries.c.project_id, func.date(entries.c.start_time))
+    )
+    if user_id is not None:
+        delete = delete.where(DailyRollup.user_id == user_id)
+
+    db.session.execute(delete)
+    result = db.session.execute(
+        DailyRollup.__table__.insert().from_select(
+            ['user_id', 'project_id', 'day', 'minutes', 'entry_count'], source)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,88 @@
+"""
+SQL výrazy, které se na každém databázovém backendu zapisují jinak.
+
+Kompilují se až podle dialektu připojení, takže stejný dotaz běží na MySQL
+(produkce), SQLite (lokální vývoj a benchmarky) i PostgreSQL.
+"""
+from sqlalchemy import String, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class day_label(FunctionElement):
+    """Den jako 'YYYY-MM-DD'."""
+    type = String()
+    name = 'day_label'
+    inherit_cache = True
+
+
+class week_label(FunctionElement):
+    """Týden jako 'YYYY-MM-DD' jeho pondělí (ISO týden)."""
+    type = String()
+    name = 'week_label'
+    inherit_cache = True
+
+
+class month_label(FunctionElement):
+    """Měsíc jako 'YYYY-MM'."""
+    type = String()
+    name = 'month_label'
+    inherit_cache = True
+
+
+PERIOD_LABELS = {
+    'daily': day_label,
+    'weekly': week_label,
+    'monthly': month_label,
+}
+PERIODS = tuple(PERIOD_LABELS)
+
+
+def period_label(period, column):
+    """
+    Textový popisek období pro seskupení reportů. Na všech backendech vrací
+    stejné řetězce, takže výsledky reportů jsou porovnatelné mezi MySQL,
+    SQLite a PostgreSQL.
+    """
+    return PERIOD_LABELS[period](column)
+
+
+# Formáty vkládáme přímo do SQL (literal_binds), aby byl výraz v SELECT
+# i GROUP BY textově shodný i u driverů s parametry na straně serveru.
+
+@compiles(day_label)
+@compiles(week_label)
+@compiles(month_label)
+def _period_label_default(element, compiler, **kw):
+    # MySQL
+    kw['literal_binds'] = True
+    column = list(element.clauses)[0]
+    if isinstance(element, week_label):
+        column = func.subdate(column, func.weekday(column))
+    fmt = '%Y-%m' if isinstance(element, month_label) else '%Y-%m-%d'
+    return compiler.process(func.date_format(column, fmt), **kw)
+
+
+@compiles(day_label, 'sqlite')
+@compiles(week_label, 'sqlite')
+@compiles(month_label, 'sqlite')
+def _period_label_sqlite(element, compiler, **kw):
+    kw['literal_binds'] = True
+    column = list(element.clauses)[0]
+    if isinstance(element, week_label):
+        # nejbližší neděle (včetně) minus 6 dní = pondělí téhož týdne
+        return compiler.process(func.date(column, 'weekday 0', '-6 days'), **kw)
+    fmt = '%Y-%m' if isinstance(element, month_label) else '%Y-%m-%d'
+    return compiler.process(func.strftime(fmt, column), **kw)
+
+
+@compiles(day_label, 'postgresql')
+@compiles(week_label, 'postgresql')
+@compiles(month_label, 'postgresql')
+def _period_label_postgresql(element, compiler, **kw):
+    kw['literal_binds'] = True
+    column = list(element.clauses)[0]
+    if isinstance(element, week_label):
+        column = func.date_trunc('week', column)
+    fmt = 'YYYY-MM' if isinstance(element, month_label) else 'YYYY-MM-DD'
+    return compiler.process(func.to_char(column, fmt), **kw)
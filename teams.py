@@ -0,0 +1,146 @@
+"""
+Týmy: sdílené projekty a týmový report.
+
+Projekt s team_id vidí a vykazují na něj všichni členové týmu, vlastníkem
+zůstává Project.user_id. Týmový report sčítá daily_rollup za všechny členy
+na projektech týmu seskupeným dotazem (uživatel × projekt × období) nad
+stránkou členů – nikdy smyčkou přes uživatele s dotazem na každého.
+"""
+from datetime import date
+
+from sqlalchemy import func, or_, select
+
+from models import db, User, Project, Team, TeamMembership, DailyRollup
+from sql_funcs import period_label, PERIODS
+
+MANAGER = 'manager'
+MEMBER = 'member'
+ROLES = (MANAGER, MEMBER)
+
+# členů na stránku týmového reportu
+TEAM_REPORT_PAGE_SIZE = 50
+
+
+def accessible_projects(user_id):
+    """
+    Dotaz na projekty, které uživatel vidí a smí na ně vykazovat: vlastní
+    a sdílené projekty jeho týmů.
+    """
+    team_ids = select(TeamMembership.team_id).where(TeamMembership.user_id == user_id)
+    return Project.query.filter(
+        or_(Project.user_id == user_id, Project.team_id.in_(team_ids))
+    ).order_by(Project.id)
+
+
+def can_log_to(user_id, project_id):
+    """Smí uživatel vykazovat na projekt (vlastní nebo sdílený jeho týmem)?"""
+    query = accessible_projects(user_id).filter(Project.id == project_id).order_by(None)
+    return db.session.query(query.exists()).scalar()
+
+
+def user_teams(user_id):
+    """Týmy uživatele s jeho rolí: [(Team, role), ...] podle názvu."""
+    return (
+        db.session.query(Team, TeamMembership.role)
+        .join(TeamMembership, TeamMembership.team_id == Team.id)
+        .filter(TeamMembership.user_id == user_id)
+        .order_by(Team.name)
+        .all()
+    )
+
+
+def get_membership(team_id, user_id):
+    return db.session.get(TeamMembership, (team_id, user_id))
+
+
+def team_members(team_id):
+    """Členové týmu [(user_id, username, role), ...] podle jména."""
+    return (
+        db.session.query(User.id, User.username, TeamMembership.role)
+        .join(TeamMembership, TeamMembership.user_id == User.id)
+        .filter(TeamMembership.team_id == team_id)
+        .order_by(User.username)
+        .all()
+    )
+
+
+def team_report(team_id, period, start_date, end_date, page=1, page_size=TEAM_REPORT_PAGE_SIZE):
+    """
+    Hodiny členů týmu na projektech týmu po obdobích.
+
+    Stránkuje se po členech (podle jména). Na stránku padnou dva dotazy nad
+    daily_rollup: hodiny členů stránky seskupené po (uživatel, projekt,
+    období) a součty za celý tým po obdobích, ze kterých jsou i sloupce
+    (labels), takže jsou stejné na všech stránkách.
+    """
+    if period not in PERIODS:
+        period = 'monthly'
+    grouping = period_label(period, DailyRollup.day)
+    member_ids = select(TeamMembership.user_id).where(TeamMembership.team_id == team_id)
+    project_ids = select(Project.id).where(Project.team_id == team_id)
+    filters = [DailyRollup.project_id.in_(project_ids), DailyRollup.entry_count > 0]
+    if start_date:
+        filters.append(DailyRollup.day >= date.fromisoformat(start_date))
+    if end_date:
+        filters.append(DailyRollup.day <= date.fromisoformat(end_date))
+
+    totals = {
+        str(per): float(hrs or 0)
+        for per, hrs in db.session.query(grouping, func.sum(DailyRollup.minutes) / 60.0)
+        .filter(DailyRollup.user_id.in_(member_ids), *filters)
+        .group_by(grouping)
+    }
+    labels = sorted(totals)
+    index = {label: i for i, label in enumerate(labels)}
+
+    members = (
+        db.session.query(User.id, User.username)
+        .join(TeamMembership, TeamMembership.user_id == User.id)
+        .filter(TeamMembership.team_id == team_id)
+        .order_by(User.username)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+        .all()
+    )
+    has_next = len(members) > page_size
+    members = members[:page_size]
+
+    cells = {}
+    if members:
+        hours = (
+            db.session.query(
+                DailyRollup.user_id,
+                Project.name,
+                grouping.label('period'),
+                (func.sum(DailyRollup.minutes) / 60.0).label('total_hours')
+            )
+            .join(Project, Project.id == DailyRollup.project_id)
+            .filter(DailyRollup.user_id.in_([user_id for user_id, _ in members]), *filters)
+            .group_by(DailyRollup.user_id, Project.name, grouping)
+            .all()
+        )
+        for user_id, project_name, per, hrs in hours:
+            values = cells.setdefault(user_id, {}).setdefault(project_name, [0.0] * len(labels))
+            values[index[str(per)]] = float(hrs or 0)
+
+    rows = []
+    for user_id, username in members:
+        projects = cells.get(user_id)
+        if not projects:
+            # člen bez hodin v období má v tabulce prázdný řádek
+            rows.append({'username': username, 'project': None, 'values': [], 'total': 0.0})
+            continue
+        for name in sorted(projects):
+            values = projects[name]
+            rows.append({'username': username, 'project': name, 'values': values,
+                         'total': sum(values)})
+
+    return {
+        'period': period,
+        'labels': labels,
+        'rows': rows,
+        'totals': [totals[label] for label in labels],
+        'total': sum(totals.values()),
+        'page': page,
+        'has_next': has_next,
+    }
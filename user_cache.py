@@ -0,0 +1,103 @@
+"""
+Krátkodobá cache přihlášené identity pro Flask-Login.
+
+load_user se volá při každém požadavku (i při rychlých PUT/DELETE z
+kalendáře). Místo načítání celého User z databáze se drží jen (id,
+username) s omezenou dobou platnosti a počtem položek. Změna nebo smazání
+uživatele přes ORM položku v tomto procesu okamžitě zneplatní; ostatní
+procesy (gunicorn workery) ji uvidí nejpozději po USER_CACHE_TTL sekundách.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from models import User
+
+DEFAULT_TTL = 60
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class CachedUser(UserMixin):
+    """
+    Odlehčená identita přihlášeného uživatele (bez vztahů na projekty apod.).
+    """
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    def __repr__(self):
+        return '<CachedUser %d %s>' % (self.id, self.username)
+
+
+class UserCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user):
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = UserCache()
+
+
+def init_app(app):
+    cache.ttl = app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+    cache.max_entries = app.config.get('USER_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+
+
+def load_identity(session, user_id):
+    """
+    Vrátí CachedUser pro dané id (z cache, nebo jedním úzkým dotazem),
+    případně None, pokud uživatel neexistuje.
+    """
+    user = cache.get(user_id)
+    if user is not None:
+        return user
+    row = session.query(User.id, User.username).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    user = CachedUser(row.id, row.username)
+    cache.set(user)
+    return user
+
+
+def forget_user(user_id):
+    """Explicitní zneplatnění (např. po změně hesla mimo ORM)."""
+    cache.forget(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _forget_changed_user(mapper, connection, target):
+    forget_user(target.id)
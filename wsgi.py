@@ -0,0 +1,11 @@
+"""
+WSGI vstupní bod pro produkční server:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Server nepotřebuje příkazy `flask db ...`, takže se Flask-Migrate (a s ním
+alembic) při startu workeru vůbec nenačítá.
+"""
+from app import create_app
+
+app = create_app({'DB_MIGRATE_COMMANDS': False})